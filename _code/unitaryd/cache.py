@@ -0,0 +1,36 @@
+import os
+import numpy as np
+
+def write_atomically(path, write):
+    """Calls `write` on a binary file opened next to `path`, then renames it
+    to `path` so that concurrent runs never see a partially written file.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok = True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as f:
+        write(f)
+    os.replace(temporary_path, path)
+
+def load_or_build_npy(path, build, is_valid = None):
+    """Returns the array saved at `path`, calling `build` and saving
+    its result there if there is none yet.
+
+    If `is_valid` is given, a saved array which cannot be read or fails it
+    is rebuilt and overwritten, and a built array which fails it raises a
+    RuntimeError instead of being saved.
+    """
+    if os.path.exists(path):
+        try:
+            array = np.load(path)
+        except (OSError, ValueError):
+            array = None
+        if array is not None and (is_valid is None or is_valid(array)):
+            return array
+
+    array = np.asarray(build())
+    if is_valid is not None and not is_valid(array):
+        raise RuntimeError(f"The array built for {path} is not valid")
+    write_atomically(path, lambda f: np.save(f, array))
+    return array
@@ -1,17 +1,38 @@
 import numpy as np
 
-def monte_carlo_average(f, sample_size):
+from integrand import evaluate
+from monte_carlo import randomized_qmc_average, streaming_average
+
+def sample_from_circle(size, rng = np.random):
+    """Returns the x and y coordinate arrays of `size` random points."""
+    theta = rng.uniform(0, 2 * np.pi, size)
+    return (
+        np.cos(theta),
+        np.sin(theta)
+    )
+
+def monte_carlo_average(f, sample_size, vectorized = True):
     """Compute the average of a function `f` over the unit circle.
+    In vectorized mode `f` receives whole coordinate arrays if it supports them.
     """
-    def sample_from_circle(size):
-        theta = np.random.uniform(0, 2 * np.pi, size)
-        return zip(
-            np.cos(theta),
-            np.sin(theta)
-        )
+    coordinates = sample_from_circle(sample_size)
+    if vectorized:
+        return np.mean(evaluate(f, *coordinates))
+    return np.mean([f(*sample) for sample in zip(*coordinates)])
 
-    return np.mean([f(*sample) for sample in sample_from_circle(sample_size)])
+def points_on_circle(u):
+    """Maps the (n, 1) points of the unit interval to the x and y
+    coordinate arrays of n points spread evenly over the circle.
+    """
+    theta = 2 * np.pi * u[:, 0]
+    return (
+        np.cos(theta),
+        np.sin(theta)
+    )
 
 if __name__ == "__main__":
     f = lambda x, y: x**2
     print(monte_carlo_average(f, 100_000))
+    # Stop sampling once the standard error is below 1e-3
+    print(streaming_average(lambda size, rng: evaluate(f, *sample_from_circle(size, rng)), 100_000, tolerance = 1e-3))
+    print(randomized_qmc_average(lambda u: evaluate(f, *points_on_circle(u)), 1, 4_096))
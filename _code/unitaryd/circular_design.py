@@ -1,27 +1,52 @@
 import numpy as np
 
-def circular_design_average(f, t):
+from functools import lru_cache
+
+from integrand import evaluate
+
+@lru_cache(maxsize = None)
+def polygon_design(t):
+    """Returns the vertex corners of the regular polygon with t + 1 sides,
+    a circular t-design, as a read-only (t + 1, 2) array.
+    """
+    angles = np.arange(t + 1) * (2 * np.pi / (t + 1))
+    points = np.column_stack((np.cos(angles), np.sin(angles)))
+    points.setflags(write = False)
+    return points
+
+def circular_design_average(f, t, vectorized = True):
     """Computes the average of a function `f` using circular
     t-designs, specifically polygons.
     """
-    def polygon(number_of_sides):
-        """
-        Given the number of sides, this function returns
-        the coordinates of the vertex corners of the polygon with
-        the given number of sides.
-        """
-        internal_angle = 2 * np.pi / number_of_sides
-        coordinates = []
-        
-        for point in range(number_of_sides):
-            new_angle = point * internal_angle
-            coordinates.append([np.cos(new_angle), np.sin(new_angle)])
-        
-        return coordinates
-
-    return np.mean([f(*point) for point in polygon(t + 1)])
+    if vectorized:
+        return np.mean(evaluate(f, *polygon_design(t).T))
+    return np.mean([f(*point) for point in polygon_design(t)])
+
+def circular_design_averages(f, ts, tolerance = 1e-12):
+    """Computes the averages of `f` over the designs of every strength in `ts`
+    with a single evaluation of `f` on all their points together.
+
+    Also returns the smallest t from which every average over a design of
+    higher strength agrees with the last one within `tolerance`.
+    """
+    ts = np.asarray(ts)
+    points = np.concatenate([polygon_design(t) for t in ts])
+    values = evaluate(f, *points.T)
+
+    # Each design occupies t + 1 consecutive entries
+    starts = np.concatenate(([0], np.cumsum(ts + 1)[:-1]))
+    averages = np.add.reduceat(values, starts) / (ts + 1)
+
+    converged = np.abs(averages - averages[-1]) <= tolerance
+    # Scanning backwards, stop at the first design that disagrees
+    disagreeing = np.flatnonzero(~converged)
+    converged_t = ts[disagreeing[-1] + 1] if len(disagreeing) else ts[0]
+    return averages, converged_t
 
 if __name__ == "__main__":
     f = lambda x, y: x**8 + (x**5)*(y**3) + x*(y**7)
     for vertex_count in range(2, 15):
         print(f"Design = {vertex_count + 1}\taverage = {circular_design_average(f, vertex_count)}")
+
+    averages, converged_t = circular_design_averages(f, range(2, 15))
+    print(f"The average converges to {averages[-1]} from t = {converged_t}")
@@ -1,25 +1,93 @@
+import os
 import numpy as np
 import scipy.linalg as la
 
 from collections import deque
-
-def matrix_in_list(element, list):
-    for list_element in list:
-        if np.allclose(list_element, element):
-            return True
-    return False
-
-def matrix_is_normalizer(x):
-    pauli_group = Pauli.group()
+from functools import lru_cache
+
+from cache import load_or_build_npy
+from clifford_tableau import CliffordTableau
+
+# Groups are built at most once per process and saved to disk
+# so that later runs only need to load them
+GROUP_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".group_cache")
+group_cache = {}
+
+def cached_group(name, n_qubits, phase_convention, build, order):
+    """Returns the group `name` as a tuple of read-only matrices,
+    calling `build` only if it is neither in memory nor on disk.
+    A saved group without the expected `order` is rebuilt.
+    """
+    key = (name, n_qubits, phase_convention)
+    if key not in group_cache:
+        path = os.path.join(GROUP_CACHE_DIRECTORY, f"{name}_{n_qubits}_{phase_convention}.npy")
+        elements = load_or_build_npy(
+            path,
+            lambda: np.array([np.asarray(x, dtype = complex) for x in build()]),
+            lambda elements: elements.shape == (order, 2**n_qubits, 2**n_qubits)
+        )
+        elements.setflags(write = False)
+        group_cache[key] = tuple(np.asmatrix(x) for x in elements)
+    return group_cache[key]
+
+class MatrixSet:
+    """A set of matrices with constant time membership tests.
+
+    Each matrix is canonicalized into a hashable key by rounding its
+    entries to `decimals` places. If `up_to_phase` is set, the global
+    phase is fixed first by making the first non-zero entry real and positive
+    so that matrices differing only by a global phase share the same key.
+    """
+    def __init__(self, matrices = (), up_to_phase = False, decimals = 8):
+        self.up_to_phase = up_to_phase
+        self.decimals = decimals
+        self.keys = set()
+        self.elements = []
+        for matrix in matrices:
+            self.add(matrix)
+
+    def key(self, x):
+        x = np.asarray(x, dtype = complex).ravel()
+        if self.up_to_phase:
+            pivot = x[np.argmax(np.abs(x) > 10**(-self.decimals))]
+            x = x * (abs(pivot) / pivot)
+        # Adding zero turns negative zeros into positive ones
+        return (np.round(x, self.decimals) + 0).tobytes()
+
+    def add(self, x):
+        """Adds `x` to the set, returns False if it was already present."""
+        key = self.key(x)
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        self.elements.append(x)
+        return True
+
+    def __contains__(self, x):
+        return self.key(x) in self.keys
+
+    def __iter__(self):
+        return iter(self.elements)
+
+    def __len__(self):
+        return len(self.elements)
+
+@lru_cache(maxsize = None)
+def pauli_group_index(n_qubits = 1):
+    return MatrixSet(Pauli.group(n_qubits))
+
+def matrix_is_normalizer(x, pauli_group = None):
+    if pauli_group is None:
+        pauli_group = pauli_group_index(x.shape[0].bit_length() - 1)
     for pauli in pauli_group:
         p = x @ pauli @ x.conj().T
-        if matrix_in_list(p, pauli_group):
+        if p in pauli_group:
             return True
     return False
 
 class Pauli:
     @staticmethod
-    def generators():
+    def generators(n_qubits = 1):
         X = np.matrix([
             [0, 1],
             [1, 0]
@@ -33,29 +101,37 @@ class Pauli:
             [0, -1]
         ])
 
-        return [X, Y, Z]
+        if n_qubits == 1:
+            return [X, Y, Z]
+
+        # Each generator acts on a single qubit of the register
+        return [
+            np.asmatrix(np.kron(np.kron(np.eye(2**qubit), P), np.eye(2**(n_qubits - qubit - 1))))
+            for qubit in range(n_qubits) for P in (X, Y, Z)
+        ]
 
     @staticmethod
-    def group():
-        group = []
+    def build_group(n_qubits = 1):
+        group = MatrixSet()
         queue = deque()
         queue.append(
-            np.matrix([
-                [1, 0],
-                [0, 1]
-            ])
+            np.asmatrix(np.eye(2**n_qubits))
         )
 
         while queue:
             x = queue.popleft()
-            if matrix_in_list(x, group):
-                continue
-
-            group.append(x)
-            for generator in Pauli.generators():
-                queue.append(x @ generator)
+            if group.add(x):
+                for generator in Pauli.generators(n_qubits):
+                    queue.append(x @ generator)
     
-        return group
+        return group.elements
+
+    @staticmethod
+    def group(n_qubits = 1):
+        """The Pauli group including the phases 1, -1, i and -i."""
+        # Every Pauli word comes with each of the four phases
+        return cached_group("pauli", n_qubits, "signed",
+            lambda: Pauli.build_group(n_qubits), 4**(n_qubits + 1))
 
 class Clifford:
     @staticmethod
@@ -73,8 +149,11 @@ class Clifford:
         return [H, S]
 
     @staticmethod
-    def group():
-        group = []
+    def build_group():
+        # Elements are indexed up to a global phase, this accounts
+        # for matrices with a negated phase among others
+        group = MatrixSet(up_to_phase = True)
+        pauli_group = pauli_group_index()
         queue = deque()
         queue.append(
             np.matrix([
@@ -88,17 +167,33 @@ class Clifford:
             global_phase = 1 / np.emath.sqrt(la.det(x))
             x = x * global_phase
 
-            # We need to account for a matrix with a negated phase
-            if matrix_in_list(x, group) or matrix_in_list(-x, group):
+            if x in group:
                 continue
 
-            if matrix_is_normalizer(x):
-                group.append(x)
+            if matrix_is_normalizer(x, pauli_group):
+                group.add(x)
                 for clifford in Clifford.generators():
                     queue.append(x @ clifford)
     
-        return group
+        return group.elements
+
+    @staticmethod
+    def group(n_qubits = 1):
+        """The Clifford group modulo global phases, each element
+        being represented by a matrix with unit determinant.
+        """
+        def build():
+            if n_qubits == 1:
+                return Clifford.build_group()
+            # The tableau enumeration scales to more than one qubit
+            unitaries = [x.to_unitary() for x in CliffordTableau.group(n_qubits)]
+            return [u / np.linalg.det(u)**(1 / 2**n_qubits) for u in unitaries]
+
+        # The order of the Clifford group modulo phases is 2^(n^2 + 2n) prod_j (4^j - 1)
+        order = 2**(n_qubits**2 + 2 * n_qubits) * np.prod([4**j - 1 for j in range(1, n_qubits + 1)])
+        return cached_group("clifford", n_qubits, "det", build, int(order))
 
 if __name__ == "__main__":
     from pprint import pprint
     pprint(len(Clifford.group()))
+    pprint(len(Clifford.group(2)))
@@ -0,0 +1,359 @@
+import numpy as np
+
+from collections import deque
+
+def pauli_product_phase(x1, z1, x2, z2):
+    """Returns the exponent of i picked up when multiplying the Hermitian
+    Paulis P(x1, z1) P(x2, z2) = i^g P(x1 ^ x2, z1 ^ z2), summed over qubits.
+    """
+    x1, z1, x2, z2 = (np.asarray(a, dtype = int) for a in (x1, z1, x2, z2))
+    g = np.where(
+        (x1 & z1).astype(bool),
+        z2 - x2,
+        np.where(x1.astype(bool), z2 * (2 * x2 - 1), z1 * x2 * (1 - 2 * z2))
+    )
+    return g.sum(axis = -1)
+
+def pauli_matrix(x, z, exponent = 0):
+    """Dense matrix of i^exponent P(x, z) where P(x, z) is the tensor product
+    of i^(x_j z_j) X^x_j Z^z_j over all qubits j, qubit 0 being leftmost.
+    """
+    X = np.array([
+        [0, 1],
+        [1, 0]
+    ], dtype = complex)
+    Z = np.array([
+        [1,  0],
+        [0, -1]
+    ], dtype = complex)
+
+    matrix = np.eye(1, dtype = complex)
+    for x_j, z_j in zip(x, z):
+        single = (1j ** (x_j * z_j)) * np.linalg.matrix_power(X, x_j) @ np.linalg.matrix_power(Z, z_j)
+        matrix = np.kron(matrix, single)
+    return (1j ** exponent) * matrix
+
+def symplectic_inner(v, w):
+    """Symplectic inner product of bit vectors in the interleaved
+    (x_0, z_0, x_1, z_1, ...) ordering, `w` may hold one vector per row.
+    """
+    v, w = np.asarray(v, dtype = int), np.asarray(w, dtype = int)
+    return (w[..., 0::2] @ v[1::2] + w[..., 1::2] @ v[0::2]) % 2
+
+def transvection(h, v):
+    """Applies the symplectic transvection v -> v + <h, v> h to `v`,
+    which may hold one vector per row.
+    """
+    h, v = np.asarray(h, dtype = int), np.asarray(v, dtype = int)
+    return (v + np.multiply.outer(symplectic_inner(h, v), h)) % 2
+
+def find_transvection(x, y):
+    """Finds h1 and h2 such that y = Z_h2 Z_h1 x where Z_h is the transvection
+    by h, following Lemma 2 of Koenig and Smolin (arXiv:1406.2170).
+    """
+    x, y = np.asarray(x, dtype = int), np.asarray(y, dtype = int)
+    size = len(x)
+    h = np.zeros((2, size), dtype = int)
+    if np.array_equal(x, y):
+        return h
+    if symplectic_inner(x, y) == 1:
+        h[0] = (x + y) % 2
+        return h
+
+    z = np.zeros(size, dtype = int)
+    x_pairs = x[0::2] | x[1::2]
+    y_pairs = y[0::2] | y[1::2]
+    both = np.flatnonzero(x_pairs & y_pairs)
+    if len(both):
+        # There is a qubit on which neither x nor y is the identity
+        i = 2 * both[0]
+        z[i:i + 2] = (x[i:i + 2] + y[i:i + 2]) % 2
+        if not z[i:i + 2].any():
+            z[i + 1] = 1
+            if x[i] != x[i + 1]:
+                z[i] = 1
+    else:
+        # Otherwise pick a qubit where only x is non-trivial
+        # and a qubit where only y is non-trivial
+        for pairs, v in ((x_pairs & (1 - y_pairs), x), (y_pairs & (1 - x_pairs), y)):
+            i = 2 * np.flatnonzero(pairs)[0]
+            if v[i] == v[i + 1]:
+                z[i + 1] = 1
+            else:
+                z[i], z[i + 1] = v[i + 1], v[i]
+
+    h[0] = (x + z) % 2
+    h[1] = (y + z) % 2
+    return h
+
+def random_symplectic(n_qubits, rng):
+    """Draws a uniformly random 2n x 2n symplectic matrix in the interleaved
+    ordering with O(n^3) work, following Koenig and Smolin (arXiv:1406.2170).
+    """
+    size = 2 * n_qubits
+    e1 = np.zeros(size, dtype = int)
+    e1[0] = 1
+
+    # The image f1 of e1 is any non-zero vector
+    f1 = np.zeros(size, dtype = int)
+    while not f1.any():
+        f1 = rng.integers(0, 2, size)
+    T = find_transvection(e1, f1)
+
+    # The image of e2 is fixed by 2n - 1 further random bits
+    bits = rng.integers(0, 2, size - 1)
+    e_prime = e1.copy()
+    e_prime[2:] = bits[1:]
+    h0 = transvection(T[1], transvection(T[0], e_prime))
+    if bits[0] == 1:
+        f1 = np.zeros(size, dtype = int)
+
+    g = np.eye(size, dtype = int)
+    if n_qubits > 1:
+        g[2:, 2:] = random_symplectic(n_qubits - 1, rng)
+    for h in (T[0], T[1], h0, f1):
+        g = transvection(h, g)
+    return g
+
+class CliffordTableau:
+    """A Clifford unitary, up to a global phase, stored as a binary symplectic
+    matrix plus a phase vector.
+
+    Row k of `symplectic` holds the (x, z) bits of the Pauli C X_k C^dagger
+    for k < n and of C Z_(k - n) C^dagger for k >= n, and `phases[k]` is 1
+    when that Pauli carries a minus sign. This takes O(n^2) bits instead
+    of the 4^n complex entries of the dense unitary.
+    """
+    def __init__(self, symplectic, phases):
+        self.symplectic = np.asarray(symplectic, dtype = np.uint8)
+        self.phases = np.asarray(phases, dtype = np.uint8)
+        self.n_qubits = self.symplectic.shape[0] // 2
+
+    @staticmethod
+    def identity(n_qubits: int):
+        if n_qubits < 1:
+            raise ValueError("The number of qubits must be at least 1")
+        return CliffordTableau(
+            np.eye(2 * n_qubits, dtype = np.uint8),
+            np.zeros(2 * n_qubits, dtype = np.uint8)
+        )
+
+    def copy(self):
+        return CliffordTableau(self.symplectic.copy(), self.phases.copy())
+
+    def key(self):
+        """A hashable key uniquely identifying the Clifford up to a global phase."""
+        return np.packbits(
+            np.concatenate((self.symplectic.ravel(), self.phases))
+        ).tobytes()
+
+    def __eq__(self, other):
+        return self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def hadamard(self, qubit: int):
+        """Returns the Clifford H C, that is this Clifford followed by
+        a Hadamard gate on `qubit`.
+        """
+        n = self.n_qubits
+        result = self.copy()
+        x, z = result.symplectic[:, qubit], result.symplectic[:, n + qubit]
+        result.phases ^= x & z
+        result.symplectic[:, [qubit, n + qubit]] = result.symplectic[:, [n + qubit, qubit]]
+        return result
+
+    def phase(self, qubit: int):
+        """Returns the Clifford S C, that is this Clifford followed by
+        a phase gate on `qubit`.
+        """
+        n = self.n_qubits
+        result = self.copy()
+        x = result.symplectic[:, qubit]
+        result.phases ^= x & result.symplectic[:, n + qubit]
+        result.symplectic[:, n + qubit] ^= x
+        return result
+
+    def cnot(self, control: int, target: int):
+        """Returns the Clifford CNOT C, that is this Clifford followed by
+        a CNOT gate from `control` to `target`.
+        """
+        if control == target:
+            raise ValueError("The control and target qubits must be different")
+        n = self.n_qubits
+        result = self.copy()
+        s = result.symplectic
+        x_c, z_c = s[:, control], s[:, n + control]
+        x_t, z_t = s[:, target], s[:, n + target]
+        result.phases ^= x_c & z_t & (x_t ^ z_c ^ 1)
+        s[:, target] ^= x_c
+        s[:, n + control] ^= z_t
+        return result
+
+    def __matmul__(self, other):
+        """Composition following the matrix product convention:
+        `self @ other` applies `other` first, then `self`.
+        """
+        n = self.n_qubits
+        if other.n_qubits != n:
+            raise ValueError("Cannot compose Cliffords acting on different numbers of qubits")
+
+        x = other.symplectic[:, :n].astype(int)
+        z = other.symplectic[:, n:].astype(int)
+        # Expand each row as i^(x.z) (-1)^r prod_j X_j^x_j Z_j^z_j
+        # then replace every X_j and Z_j by its image under `self`
+        exponent = 2 * other.phases.astype(int) + (x & z).sum(axis = 1)
+        result = np.zeros_like(other.symplectic)
+        for j in range(n):
+            for row, mask in ((j, x[:, j]), (n + j, z[:, j])):
+                mask = mask.astype(bool)
+                image = self.symplectic[row]
+                exponent[mask] += 2 * int(self.phases[row]) + pauli_product_phase(
+                    result[mask, :n], result[mask, n:],
+                    image[:n], image[n:]
+                )
+                result[mask] ^= image
+
+        return CliffordTableau(result, (exponent % 4) // 2)
+
+    def inverse(self):
+        n = self.n_qubits
+        # Rows of a symplectic matrix S satisfy S Omega S^T = Omega
+        # so that its inverse is Omega S^T Omega
+        omega = np.roll(np.eye(2 * n, dtype = np.uint8), n, axis = 1)
+        unsigned = CliffordTableau(
+            (omega @ self.symplectic.T @ omega) % 2,
+            np.zeros(2 * n, dtype = np.uint8)
+        )
+        # C C_unsigned^-1 only flips signs, i.e. it is a Pauli which is
+        # its own inverse so its signs are exactly the ones we are missing
+        return CliffordTableau(unsigned.symplectic, (self @ unsigned).phases)
+
+    def pauli_image(self, k: int):
+        """Dense matrix of the image of the k-th generator X_0, ..., Z_(n-1)."""
+        n = self.n_qubits
+        row = self.symplectic[k]
+        return pauli_matrix(row[:n], row[n:], 2 * int(self.phases[k]))
+
+    def to_unitary(self):
+        """Builds the dense unitary, with its global phase fixed so that the
+        first non-zero entry is real and positive.
+        """
+        n = self.n_qubits
+        dim = 2**n
+        images = [self.pauli_image(k) for k in range(2 * n)]
+
+        # C|0...0> is the unique state stabilized by every C Z_j C^dagger
+        projector = np.eye(dim, dtype = complex)
+        for image in images[n:]:
+            projector = projector @ (np.eye(dim) + image) / 2
+        column = projector[:, np.argmax(np.linalg.norm(projector, axis = 0))]
+        column = column / np.linalg.norm(column)
+        pivot = column[np.argmax(np.abs(column) > 1e-8)]
+        column = column * (abs(pivot) / pivot)
+
+        # C|b> is obtained from C|0...0> by the images of the X_j flipping the bits of b
+        unitary = np.zeros((dim, dim), dtype = complex)
+        unitary[:, 0] = column
+        for b in range(1, dim):
+            qubit = n - b.bit_length()
+            unitary[:, b] = images[qubit] @ unitary[:, b ^ (1 << (n - 1 - qubit))]
+        return np.asmatrix(unitary)
+
+    @staticmethod
+    def from_unitary(unitary):
+        unitary = np.asarray(unitary, dtype = complex)
+        dim = unitary.shape[0]
+        n = dim.bit_length() - 1
+        if unitary.shape != (dim, dim) or dim != 2**n or n < 1:
+            raise ValueError("The unitary must be a square matrix acting on at least one qubit")
+
+        symplectic = np.zeros((2 * n, 2 * n), dtype = np.uint8)
+        phases = np.zeros(2 * n, dtype = np.uint8)
+        identity = CliffordTableau.identity(n)
+        for k in range(2 * n):
+            image = unitary @ identity.pauli_image(k) @ unitary.conj().T
+            # X^x Z^z maps |j> to (-1)^(z.j) |j ^ x>
+            x_int = int(np.argmax(np.abs(image[:, 0])))
+            x = np.array([(x_int >> (n - 1 - j)) & 1 for j in range(n)])
+            z = np.array([
+                int(np.real(image[x_int ^ (1 << (n - 1 - j)), 1 << (n - 1 - j)] / image[x_int, 0]) < 0)
+                for j in range(n)
+            ])
+            if not np.allclose(image, pauli_matrix(x, z, 0)) and not np.allclose(image, -pauli_matrix(x, z, 0)):
+                raise ValueError("The unitary is not a Clifford")
+            symplectic[k] = np.concatenate((x, z))
+            phases[k] = int(np.real(image[x_int, 0] / (1j ** (x @ z))) < 0)
+
+        return CliffordTableau(symplectic, phases)
+
+    @staticmethod
+    def generators(n_qubits: int):
+        """Hadamard and phase gates on every qubit and CNOT gates between
+        neighbouring qubits, which together generate the Clifford group.
+        """
+        identity = CliffordTableau.identity(n_qubits)
+        return (
+            [identity.hadamard(q) for q in range(n_qubits)]
+            + [identity.phase(q) for q in range(n_qubits)]
+            + [identity.cnot(q, q + 1) for q in range(n_qubits - 1)]
+        )
+
+    @staticmethod
+    def random(n_qubits: int, rng = None):
+        """Draws a Clifford uniformly at random from the n-qubit Clifford group
+        without enumerating it. `rng` is a seed or a `np.random.Generator`.
+        """
+        if n_qubits < 1:
+            raise ValueError("The number of qubits must be at least 1")
+        rng = np.random.default_rng(rng)
+        interleaved = random_symplectic(n_qubits, rng)
+        # Move from (x_0, z_0, x_1, z_1, ...) to (x_0, x_1, ..., z_0, z_1, ...)
+        order = np.concatenate((np.arange(0, 2 * n_qubits, 2), np.arange(1, 2 * n_qubits, 2)))
+        # Every choice of signs gives a different Clifford
+        return CliffordTableau(
+            interleaved[np.ix_(order, order)],
+            rng.integers(0, 2, 2 * n_qubits)
+        )
+
+    @staticmethod
+    def group(n_qubits: int):
+        """Enumerates the n-qubit Clifford group modulo global phases,
+        which has 24 elements for one qubit and 11,520 for two qubits.
+        """
+        def neighbours(x):
+            for q in range(n_qubits):
+                yield x.hadamard(q)
+                yield x.phase(q)
+            for q in range(n_qubits - 1):
+                yield x.cnot(q, q + 1)
+
+        identity = CliffordTableau.identity(n_qubits)
+        group = [identity]
+        seen = {identity.key()}
+        queue = deque([identity])
+
+        while queue:
+            x = queue.popleft()
+            for y in neighbours(x):
+                key = y.key()
+                if key not in seen:
+                    seen.add(key)
+                    group.append(y)
+                    queue.append(y)
+
+        return group
+
+def sample_cliffords(n_qubits: int, sample_size: int, seed = None):
+    """Returns `sample_size` uniformly random n-qubit Cliffords as dense
+    unitaries, for use in place of the full group in design averages.
+    """
+    rng = np.random.default_rng(seed)
+    return [CliffordTableau.random(n_qubits, rng).to_unitary() for _ in range(sample_size)]
+
+if __name__ == "__main__":
+    print("Number of single-qubit Cliffords:", len(CliffordTableau.group(1)))
+    print("Number of two-qubit Cliffords:", len(CliffordTableau.group(2)))
+    print("A random 3-qubit Clifford has symplectic matrix:")
+    print(CliffordTableau.random(3, rng = 1).symplectic)
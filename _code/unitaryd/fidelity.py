@@ -0,0 +1,106 @@
+import numpy as np
+import pennylane as qml
+
+X = np.array([
+    [0, 1],
+    [1, 0]
+], dtype = complex)
+
+def error_x(calibration_error_angle):
+    """Matrix of the miscalibrated X gate RX(pi + angle). An array of
+    angles gives the matrices stacked along the leading axes.
+    """
+    angle = (np.pi + np.asarray(calibration_error_angle)) / 2
+    cos, sin = np.cos(angle), -1j * np.sin(angle)
+    return np.stack([
+        np.stack([cos, sin], axis = -1),
+        np.stack([sin, cos], axis = -1)
+    ], axis = -2)
+
+def analytic_swap_test(psi, phi, n_shots = None, rng = None):
+    """Returns what the SWAP test between the states `psi` and `phi`
+    estimates, namely |<psi|phi>|^2, computed directly from the state vectors.
+
+    If `n_shots` is given, the number of times the control qubit is measured
+    in |1>, which happens with probability (1 - |<psi|phi>|^2) / 2, is drawn
+    from the binomial distribution to reproduce the shot noise of the circuit.
+    Batches of states along leading axes give an array of fidelities.
+    """
+    fidelity = np.abs(np.sum(np.conj(psi) * phi, axis = -1))**2
+    if n_shots is None:
+        return fidelity
+
+    rng = np.random.default_rng(rng)
+    one_state_count = rng.binomial(n_shots, np.clip((1 - fidelity) / 2, 0, 1))
+    return 1 - (2 / n_shots) * one_state_count
+
+def gate_fidelity_sweep(calibration_error_angles, psi, n_shots = None, rng = None):
+    """Returns the average SWAP test fidelity between X_e|psi> and X|psi>
+    over the (N, 2) states `psi`, for every calibration error angle.
+
+    The states and X|psi> are computed once and every (angle, state) pair
+    is evaluated in a single vectorized computation, so dense sweeps over
+    thousands of angles stay cheap.
+    """
+    psi = np.asarray(psi)
+    x_psi = psi @ X.T
+    # error_psi[a, n] = X_e(angle a)|psi_n>
+    error_psi = np.einsum("aij,nj->ani", error_x(np.ravel(calibration_error_angles)), psi)
+    fidelities = analytic_swap_test(error_psi, x_psi, n_shots, rng)
+    return fidelities.mean(axis = -1).reshape(np.shape(calibration_error_angles))
+
+def unitary_prep(state_prep_gates):
+    """The unitary of a single-qubit preparation gate, or the (N, 2, 2)
+    stack of unitaries of a list of gates, as `swap_test_circuit` takes them.
+    """
+    if callable(state_prep_gates):
+        return qml.matrix(state_prep_gates, wire_order = [0])(0)
+    return np.array([unitary_prep(gate) for gate in state_prep_gates])
+
+def PauliX_e(angle, wire):
+    qml.RX(np.pi + angle, wires = wire)
+
+n_shots = 50_000
+dev = qml.device(
+    "default.qubit",
+    wires = 3,
+    shots = n_shots
+)
+
+@qml.qnode(dev)
+def swap_test_circuit(state_prep_unitary, calibration_error_angle = None):
+    """The SWAP test between |psi> = U|0> and X|psi>, or between X_e|psi> and
+    X|psi> if a calibration error angle is given. A (N, 2, 2) stack of
+    unitaries broadcasts the circuit over all of them.
+    """
+    # Prepare the state |psi>, or X_e|psi>, on qubit 1
+    qml.QubitUnitary(state_prep_unitary, wires = 1)
+    if calibration_error_angle is not None:
+        PauliX_e(calibration_error_angle, 1)
+
+    # Prepare the state X|psi> on qubit 2
+    qml.QubitUnitary(state_prep_unitary, wires = 2)
+    qml.PauliX(wires = 2)
+
+    # Perform the SWAP test
+    qml.Hadamard(wires = 0)
+    qml.CSWAP(wires = [0, 1, 2])
+    qml.Hadamard(wires = 0)
+
+    # Making sure to collect statistics of qubit 0
+    return qml.counts(qml.PauliZ(0))
+
+def counts_fidelity(dists, n_shots):
+    """Returns the SWAP test fidelity estimated from the counts of the
+    control qubit that `qml.counts(qml.PauliZ(0))` returns, or the array
+    of fidelities for the list of counts of a broadcast execution.
+    """
+    if isinstance(dists, dict):
+        return 1 - (2 / n_shots) * dists.get(-1, 0)
+    return np.array([counts_fidelity(dist, n_shots) for dist in dists])
+
+if __name__ == "__main__":
+    zero = np.array([1, 0])
+    plus = np.array([1, 1]) / np.sqrt(2)
+    print(analytic_swap_test(zero, plus))
+    print(analytic_swap_test(zero, plus, n_shots = 50_000, rng = 1))
@@ -1,6 +1,8 @@
 import numpy as np
 import pennylane as qml
 
+from fidelity import X, counts_fidelity, error_x, gate_fidelity_sweep, n_shots, swap_test_circuit, unitary_prep
+from parallel import parallel_sum, split, swap_test_block
 
 def zero(wire):
     # This non-circuit prepares the |0> state
@@ -30,40 +32,43 @@ def minus_i(wire):
     qml.Hadamard(wires = wire)
     qml.S(wires = wire)
 
-def PauliX_e(angle, wire):
-    qml.RX(np.pi + angle, wires = wire)
-
 def swap_test(state_prep_gate, calibration_error_angle):
-    n_shots = 50_000
-    dev = qml.device(
-        "default.qubit",
-        wires = 3,
-        shots = n_shots
-    )
+    return counts_fidelity(swap_test_circuit(unitary_prep(state_prep_gate), calibration_error_angle), n_shots)
 
-    @qml.qnode(dev)
-    def swap_test_circuit():
-        # Prepare the state X_e|psi> on qubit 1
-        state_prep_gate(1)
-        PauliX_e(calibration_error_angle, 1)
-        
-        # Prepare the state X|psi> on qubit 2
-        state_prep_gate(2)
-        qml.PauliX(wires = 2)
+def swap_test_states(state_prep_gate, calibration_error_angle):
+    # The states X_e|psi> and X|psi> that `swap_test` compares
+    psi = unitary_prep(state_prep_gate)[:, 0]
+    return error_x(calibration_error_angle) @ psi, X @ psi
 
-        # Perform the SWAP test
-        qml.Hadamard(wires = 0)
-        qml.CSWAP(wires = [0, 1, 2])
-        qml.Hadamard(wires = 0)
+def broadcast_swap_test(state_prep_gates, calibration_error_angle):
+    """Runs `swap_test` for every preparation gate with a single broadcast
+    execution of the circuit on their stacked unitaries and returns the fidelities.
+    """
+    dists = swap_test_circuit(unitary_prep(state_prep_gates), calibration_error_angle)
+    return counts_fidelity(dists, n_shots)
 
-        return qml.counts(qml.PauliZ(0))
+def state_design_average(f, calibration_error_angle, states, broadcast = False):
+    """Averages `f` over the states. In broadcast mode `f` receives
+    all of them at once, as `broadcast_swap_test` expects.
+    """
+    if broadcast:
+        return np.mean(f(states, calibration_error_angle))
+    return np.mean([f(state, calibration_error_angle) for state in states])
 
-    dist = swap_test_circuit()
-    one_state_count = dist[-1] if -1 in dist else 0
-    return 1 - (2 / n_shots) * one_state_count
+def fidelity_sweep(calibration_error_angles, states, n_shots = None, rng = None):
+    """Returns the curve of the design averaged fidelity over an array of
+    calibration error angles, preparing every state only once.
+    """
+    psi = unitary_prep(states)[:, :, 0]
+    return gate_fidelity_sweep(calibration_error_angles, psi, n_shots, rng)
 
-def state_design_average(f, calibration_error_angle, states):
-    return np.mean([f(state, calibration_error_angle) for state in states])
+def parallel_state_design_average(calibration_error_angle, states, block_size = 2, seed = None, max_workers = None):
+    """Averages the SWAP test over the states in a pool of worker
+    processes. The result only depends on `seed` and `block_size`.
+    """
+    state_prep_unitaries = list(unitary_prep(states))
+    blocks = [(block, calibration_error_angle) for block in split(state_prep_unitaries, block_size)]
+    return parallel_sum(swap_test_block, blocks, seed, max_workers) / len(states)
 
 if __name__ == "__main__":
     """
@@ -80,3 +85,16 @@ if __name__ == "__main__":
                 [zero, one, plus, minus, plus_i, minus_i]
             )
         )
+    for calibration_error_angle in calibration_error_angles:
+        print(f"Parallel fidelity at angle error {calibration_error_angle} =",
+            parallel_state_design_average(
+                calibration_error_angle,
+                [zero, one, plus, minus, plus_i, minus_i],
+                seed = 0
+            )
+        )
+
+    # The whole curve over a dense array of angles at once
+    dense_angles = np.linspace(0, np.pi, 1_001)
+    curve = fidelity_sweep(dense_angles, [zero, one, plus, minus, plus_i, minus_i], n_shots = n_shots, rng = 0)
+    print("Fidelity curve at angle errors", dense_angles[::500], "=", curve[::500])
@@ -1,130 +1,45 @@
 import numpy as np
-import pennylane as qml
-import scipy.linalg as la
 
-from collections import deque
-
-
-def matrix_in_list(element, list):
-    for list_element in list:
-        if np.allclose(list_element, element):
-            return True
-    return False
-
-def matrix_is_normalizer(x):
-    pauli_group = Pauli.group()
-    for pauli in pauli_group:
-        p = x @ pauli @ x.conj().T
-        if matrix_in_list(p, pauli_group):
-            return True
-    return False
-
-class Pauli:
-    @staticmethod
-    def generators():
-        X = np.matrix([
-            [0, 1],
-            [1, 0]
-        ])
-        Y = np.matrix([
-            [ 0, -1j],
-            [1j,   0]
-        ])
-        Z = np.matrix([
-            [1,  0],
-            [0, -1]
-        ])
-
-        return [X, Y, Z]
-
-    @staticmethod
-    def group():
-        group = Pauli.generators()
-        group.append(
-            np.matrix([
-                [1, 0],
-                [0, 1]
-            ])
-        )
-    
-        return group
-
-class Clifford:
-    @staticmethod
-    def generators():
-        H = (1/np.sqrt(2)) * np.matrix([
-            [1,  1],
-            [1, -1]
-        ], dtype = complex)
-
-        S = np.matrix([
-            [1,  0],
-            [0, 1j]
-        ], dtype = complex)
-
-        return [H, S]
-
-    @staticmethod
-    def group():
-        group = []
-        queue = deque()
-        queue.append(
-            np.matrix([
-                [1, 0],
-                [0, 1]
-            ])
-        )
-
-        while queue:
-            x = queue.popleft()
-            global_phase = 1 / np.emath.sqrt(la.det(x))
-            x = x * global_phase
-
-            # We need to account for a matrix with a negated phase
-            if matrix_in_list(x, group) or matrix_in_list(-x, group):
-                continue
-
-            if matrix_is_normalizer(x):
-                group.append(x)
-                for clifford in Clifford.generators():
-                    queue.append(x @ clifford)
-    
-        return group
-
-def PauliX_e(angle, wire):
-    qml.RX(np.pi + angle, wires = wire)
+from clifford_group import Clifford
+from fidelity import X, counts_fidelity, error_x, gate_fidelity_sweep, n_shots, swap_test_circuit
+from parallel import parallel_sum, split, swap_test_block
 
 def swap_test(state_prep_unitary, calibration_error_angle):
-    n_shots = 50_000
-    dev = qml.device(
-        "default.qubit",
-        wires = 3,
-        shots = n_shots
-    )
-
-    @qml.qnode(dev)
-    def swap_test_circuit():
-        # Prepare the state X_e|psi> on qubit 1
-        qml.QubitUnitary(state_prep_unitary, wires = 1)
-        PauliX_e(calibration_error_angle, 1)
+    return counts_fidelity(swap_test_circuit(state_prep_unitary, calibration_error_angle), n_shots)
 
-        # Prepare the state X|psi> on qubit 2
-        qml.QubitUnitary(state_prep_unitary, wires = 2)
-        qml.PauliX(wires = 2)
+def broadcast_swap_test(state_prep_unitaries, calibration_error_angle):
+    """Runs `swap_test` for every unitary of the (N, 2, 2) stack with a single
+    broadcast execution of the circuit and returns the N fidelities.
+    """
+    dists = swap_test_circuit(np.asarray(state_prep_unitaries), calibration_error_angle)
+    return counts_fidelity(dists, n_shots)
 
-        # Perform the SWAP test
-        qml.Hadamard(wires = 0)
-        qml.CSWAP(wires = [0, 1, 2])
-        qml.Hadamard(wires = 0)
+def swap_test_states(state_prep_unitary, calibration_error_angle):
+    # The states X_e|psi> and X|psi> that `swap_test` compares, also for a stack of unitaries
+    psi = np.asarray(state_prep_unitary)[..., :, 0]
+    return psi @ error_x(calibration_error_angle).T, psi @ X.T
 
-        return qml.counts(qml.PauliZ(0))
+def unitary_design_average(f, calibration_error_angle, unitaries, broadcast = False):
+    """Averages `f` over the unitaries. In broadcast mode `f` receives
+    all of them stacked in a single array, as `broadcast_swap_test` expects.
+    """
+    if broadcast:
+        return np.mean(f(np.asarray(unitaries), calibration_error_angle))
+    return np.mean([f(unitary, calibration_error_angle) for unitary in unitaries])
 
-    dist = swap_test_circuit()
-    one_state_count = dist[-1] if -1 in dist else 0
-    return 1 - (2 / n_shots) * one_state_count
+def fidelity_sweep(calibration_error_angles, unitaries, n_shots = None, rng = None):
+    """Returns the curve of the design averaged fidelity over an array of
+    calibration error angles, computed from the states the unitaries prepare.
+    """
+    psi = np.asarray(unitaries)[..., :, 0]
+    return gate_fidelity_sweep(calibration_error_angles, psi, n_shots, rng)
 
-def unitary_design_average(f, calibration_error_angle, unitaries):
-    return np.mean([f(unitary, calibration_error_angle) for unitary in unitaries])
+def parallel_unitary_design_average(calibration_error_angle, unitaries, block_size = 4, seed = None, max_workers = None):
+    """Averages the SWAP test over the unitaries in a pool of worker
+    processes. The result only depends on `seed` and `block_size`.
+    """
+    blocks = [(block, calibration_error_angle) for block in split(list(unitaries), block_size)]
+    return parallel_sum(swap_test_block, blocks, seed, max_workers) / len(unitaries)
 
 if __name__ == "__main__":
     """
@@ -137,8 +52,18 @@ if __name__ == "__main__":
     for calibration_error_angle in calibration_error_angles:
         print(f"Fidelity at angle error {calibration_error_angle} =",
             unitary_design_average(
-                swap_test,
+                broadcast_swap_test,
                 calibration_error_angle,
-                group
+                group,
+                broadcast = True
             )
         )
+    for calibration_error_angle in calibration_error_angles:
+        print(f"Parallel fidelity at angle error {calibration_error_angle} =",
+            parallel_unitary_design_average(calibration_error_angle, group, seed = 0)
+        )
+
+    # The whole curve over a dense array of angles at once
+    dense_angles = np.linspace(0, np.pi, 1_001)
+    curve = fidelity_sweep(dense_angles, group, n_shots = n_shots, rng = 0)
+    print("Fidelity curve at angle errors", dense_angles[::500], "=", curve[::500])
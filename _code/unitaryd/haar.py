@@ -0,0 +1,20 @@
+import numpy as np
+
+def sample_haar_unitaries(size, dim, rng = None):
+    """Returns `size` Haar-random dim x dim unitaries as a (size, dim, dim) array.
+
+    Each unitary is the Q factor of the QR decomposition of a matrix of
+    complex Gaussians, with its columns rephased by the phases of the
+    diagonal of R so that the distribution is exactly Haar (Mezzadri, 2007).
+    `rng` is a seed or a `np.random.Generator`.
+    """
+    rng = np.random.default_rng(rng)
+    Z = (rng.standard_normal((size, dim, dim)) + 1j * rng.standard_normal((size, dim, dim))) / np.sqrt(2)
+    Q, R = np.linalg.qr(Z)
+    diagonal = np.diagonal(R, axis1 = 1, axis2 = 2)
+    return Q * (diagonal / np.abs(diagonal))[:, np.newaxis, :]
+
+if __name__ == "__main__":
+    unitaries = sample_haar_unitaries(10_000, 2, rng = 1)
+    # The average of |U_00|^2 over the Haar measure is 1/d
+    print(np.mean(np.abs(unitaries[:, 0, 0])**2))
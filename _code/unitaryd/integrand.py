@@ -0,0 +1,37 @@
+import numpy as np
+
+def broadcasts(f, *coordinates):
+    """Checks on a couple of points whether `f` accepts whole coordinate
+    arrays and returns one value per point, the same as calling it point by point.
+    """
+    probe = [np.asarray(c[:2]) for c in coordinates]
+    try:
+        values = np.broadcast_to(f(*probe), probe[0].shape)
+    except Exception:
+        return False
+    expected = [f(*point) for point in zip(*probe)]
+    return np.allclose(values, expected)
+
+def evaluate(f, *coordinates, chunk_size = 10_000):
+    """Evaluates `f` at every point given by the coordinate arrays.
+
+    If `f` broadcasts it is called once on the whole arrays, otherwise
+    it is called point by point through `np.vectorize`, one chunk of
+    `chunk_size` points at a time.
+    """
+    coordinates = [np.asarray(c) for c in coordinates]
+    if broadcasts(f, *coordinates):
+        return np.broadcast_to(f(*coordinates), coordinates[0].shape)
+
+    # Object outputs so that the type of the first value does not
+    # truncate the others, the common type is found at the end
+    vectorized_f = np.vectorize(f, otypes = [object])
+    return np.array(np.concatenate([
+        vectorized_f(*(c[start:start + chunk_size] for c in coordinates))
+        for start in range(0, len(coordinates[0]), chunk_size)
+    ]).tolist())
+
+if __name__ == "__main__":
+    x = np.linspace(-1, 1, 5)
+    print(evaluate(lambda x: x**2, x))
+    print(evaluate(lambda x: max(x, 0), x))
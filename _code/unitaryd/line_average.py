@@ -1,5 +1,8 @@
 import numpy as np
 
+from integrand import evaluate
+from monte_carlo import randomized_qmc_average, streaming_average
+
 def monte_carlo_average(f, a, b, sample_size):
     """Compute the average of a function `f` in the interval [a,b)
     The interval is right-open because of the implementation of
@@ -13,4 +16,8 @@ def monte_carlo_average(f, a, b, sample_size):
 
 if __name__ == "__main__":
     f = lambda x: 4 - x**2
-    print(monte_carlo_average(f, -1, 1, 100_000))
\ No newline at end of file
+    print(monte_carlo_average(f, -1, 1, 100_000))
+    # Stop sampling once the standard error is below 1e-3
+    print(streaming_average(lambda size, rng: evaluate(f, rng.uniform(-1, 1, size)), 100_000, tolerance = 1e-3))
+    # Scrambled Sobol points of [0, 1) mapped onto [-1, 1)
+    print(randomized_qmc_average(lambda u: evaluate(f, -1 + 2 * u[:, 0]), 1, 4_096))
\ No newline at end of file
@@ -0,0 +1,96 @@
+import numpy as np
+
+from collections import namedtuple
+from scipy.stats import norm, qmc
+
+Estimate = namedtuple("Estimate", ["mean", "stderr", "n_samples"])
+
+class RunningStatistics:
+    """Running mean and variance of a stream of samples, which may be
+    scalars or arrays, updated one chunk at a time by combining Welford
+    accumulators with the parallel update rule of Chan et al.
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, samples):
+        samples = np.asarray(samples)
+        n = len(samples)
+        if n == 0:
+            return
+
+        mean = samples.mean(axis = 0)
+        # For complex samples the variance is the mean of |x - mean|^2
+        m2 = (np.abs(samples - mean)**2).sum(axis = 0)
+        delta = mean - self.mean
+        total = self.count + n
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + m2 + np.abs(delta)**2 * (self.count * n / total)
+        self.count = total
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return np.inf
+        return self.m2 / (self.count - 1)
+
+    @property
+    def stderr(self):
+        return np.sqrt(self.variance / self.count)
+
+def streaming_average(sample, max_samples, tolerance = None, confidence = None, chunk_size = 1_000, seed = None):
+    """Averages the values returned by `sample(size, rng)`, an array of `size`
+    independent evaluations, chunk after chunk without keeping them in memory.
+
+    Sampling stops after `max_samples` evaluations or as soon as the standard
+    error is at most `tolerance`. If a `confidence` level such as 0.95 is given,
+    the half-width of the corresponding normal confidence interval is compared
+    to `tolerance` instead. For array-valued samples the largest entry counts.
+    """
+    rng = np.random.default_rng(seed)
+    z = 1 if confidence is None else norm.ppf((1 + confidence) / 2)
+    statistics = RunningStatistics()
+
+    while statistics.count < max_samples:
+        statistics.update(sample(min(chunk_size, max_samples - statistics.count), rng))
+        if tolerance is not None and np.max(z * statistics.stderr) <= tolerance:
+            break
+
+    return Estimate(statistics.mean, statistics.stderr, statistics.count)
+
+def randomized_qmc_average(integrand, dimension, n_points, n_replicates = 8, seed = None):
+    """Averages `integrand(u)`, which maps an (n, dimension) array of points
+    of the unit cube to n values, over scrambled Sobol points.
+
+    `n_points` is rounded up to a power of two, where Sobol points are best
+    balanced. Each of the `n_replicates` independent scramblings gives an
+    unbiased estimate and their spread gives the standard error.
+    """
+    if n_replicates < 2:
+        raise ValueError("At least two replicates are needed to estimate the error")
+
+    rng = np.random.default_rng(seed)
+    m = int(np.ceil(np.log2(n_points)))
+    estimates = np.array([
+        np.mean(integrand(qmc.Sobol(dimension, scramble = True, seed = rng).random_base2(m)), axis = 0)
+        for _ in range(n_replicates)
+    ])
+
+    return Estimate(
+        estimates.mean(axis = 0),
+        estimates.std(axis = 0, ddof = 1) / np.sqrt(n_replicates),
+        n_replicates * 2**m
+    )
+
+if __name__ == "__main__":
+    # The mean of the uniform distribution over [0, 1) is 1/2
+    print(streaming_average(
+        lambda size, rng: rng.uniform(0, 1, size),
+        1_000_000,
+        tolerance = 1e-3,
+        confidence = 0.95
+    ))
+    # The average of x y^2 over the unit square is 1/6
+    print(randomized_qmc_average(lambda u: u[:, 0] * u[:, 1]**2, 2, 10_000))
@@ -0,0 +1,63 @@
+import numpy as np
+import pennylane as qml
+
+from concurrent.futures import ProcessPoolExecutor
+
+from fidelity import counts_fidelity, swap_test_circuit
+
+def split(items, block_size):
+    """Splits the items into consecutive blocks of at most `block_size` items."""
+    return [items[start:start + block_size] for start in range(0, len(items), block_size)]
+
+def seeded_qnode(circuit, rng):
+    """Rebuilds the QNode `circuit` on a new copy of its device whose
+    shots are drawn from `rng`.
+    """
+    device = circuit.device
+    seeded_device = qml.device(device.name, wires = device.wires, shots = device.shots, seed = rng)
+    return qml.QNode(circuit.func, seeded_device)
+
+def seeded_swap_test_sum(circuit, args, rng):
+    """Sums the fidelities of the broadcast SWAP test `circuit(*args)`
+    executed on a device of its own whose shots are drawn from `rng`.
+    """
+    dists = seeded_qnode(circuit, rng)(*args)
+    return np.sum(counts_fidelity(dists, circuit.device.shots.total_shots))
+
+def swap_test_block(block, rng):
+    """Block function for `parallel_sum` summing the fidelities of the SWAP
+    test circuit of `fidelity` over a block given as the pair
+    (state_prep_unitaries, calibration_error_angle), the angle being None
+    for the circuit without calibration error.
+    """
+    state_prep_unitaries, calibration_error_angle = block
+    args = (np.asarray(state_prep_unitaries), calibration_error_angle)
+    return seeded_swap_test_sum(swap_test_circuit, args, rng)
+
+def run_block(block_function, block, seed_sequence):
+    return block_function(block, np.random.default_rng(seed_sequence))
+
+def parallel_sum(block_function, blocks, seed = None, max_workers = None):
+    """Returns the sum of `block_function(block, rng)` over the blocks,
+    evaluated by a pool of `max_workers` worker processes.
+
+    Every block gets its own random stream spawned from `seed` and the
+    partial sums are added in block order, so for a given seed the result
+    depends on the blocks only and not on the number of workers.
+    `block_function` must be defined at module level so that it can be
+    sent to the workers.
+    """
+    blocks = list(blocks)
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(blocks))
+    with ProcessPoolExecutor(max_workers = max_workers) as executor:
+        partial_sums = list(executor.map(
+            run_block,
+            [block_function] * len(blocks),
+            blocks,
+            seed_sequences
+        ))
+
+    total = 0
+    for partial_sum in partial_sums:
+        total = total + partial_sum
+    return total
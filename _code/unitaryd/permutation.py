@@ -1,5 +1,6 @@
 import itertools as it
 import numpy as np
+import scipy.sparse as sp
 
 from typing import List, Tuple
 
@@ -52,7 +53,56 @@ class Permutation:
             permutation_matrix[x][y] = 1
         
         return permutation_matrix
+
+    def check_order(self, order: List):
+        if len(order) != self.n_qubits:
+            raise ValueError("The order list must have the same length as the number of qubits to permute")
+
+        if len(set(order)) != self.n_qubits:
+            raise ValueError("The order list cannot contain duplicate items")
+
+        for old_index, new_index in enumerate(order):
+            if new_index < 1 or new_index > self.n_qubits:
+                raise ValueError(f"Item {new_index} at index {old_index} in order list is out of bounds")
+
+    def get_permutation_indices(self, order: List) -> np.ndarray:
+        """Returns the array y such that the permutation matrix has a one
+        at (x, y[x]) for every basis index x, computed with bit operations.
+        """
+        self.check_order(order)
+        n = self.n_qubits
+        x = np.arange(2**n, dtype = np.int64)
+        y = np.zeros_like(x)
+        # Qubit 0 is the most significant bit
+        for new_index, old_index in enumerate(order):
+            y |= ((x >> (n - old_index)) & 1) << (n - 1 - new_index)
+        return y
+
+    def get_sparse_permutation_matrix(self, order: List) -> sp.csr_matrix:
+        y = self.get_permutation_indices(order)
+        dim = len(y)
+        return sp.csr_matrix(
+            (np.ones(dim), (np.arange(dim), y)),
+            shape = (dim, dim)
+        )
+
+    def apply(self, order: List, x: np.ndarray) -> np.ndarray:
+        """Computes P x for a state, or an operator whose rows are permuted,
+        without building P by transposing the qubit axes of x.
+        P M P^T is obtained as apply(order, apply(order, M).T).T.
+        """
+        self.check_order(order)
+        n = self.n_qubits
+        x = np.asarray(x)
+        tensor = x.reshape((2,) * n + x.shape[1:])
+        axes = list(np.argsort([index - 1 for index in order])) + list(range(n, tensor.ndim))
+        return np.transpose(tensor, axes).reshape(x.shape)
     
 if __name__ == "__main__":
     permutation = Permutation(2)
-    print(permutation.get_permutation_matrix([2, 1]))
\ No newline at end of file
+    print(permutation.get_permutation_matrix([2, 1]))
+
+    # Permuting the qubits of a 20-qubit state never builds a matrix
+    state = np.zeros(2**20)
+    state[1] = 1
+    print(np.flatnonzero(Permutation(20).apply(list(range(20, 0, -1)), state)))
\ No newline at end of file
@@ -36,9 +36,27 @@ def unitary_design_average(M, t_design):
         R = R + (U @ M @ U.conj().T)
     return (1 / len(t_design)) * R
 
+def batched_unitary_design_average(M, t_design):
+    """Vectorized `unitary_design_average` taking the design as a single
+    (N, d, d) array. `M` is either one (d, d) operator or a stack of K
+    operators of shape (K, d, d), in which case all of them are twirled at once.
+    """
+    t_design = np.asarray(t_design, dtype = complex)
+    M = np.asarray(M, dtype = complex)
+    # The sum over the design is carried out inside the contraction
+    return np.einsum(
+        "nij,...jk,nlk->...il",
+        t_design, M, t_design.conj(),
+        optimize = True
+    ) / len(t_design)
+
 if __name__ == "__main__":
     S = np.matrix([
         [1,  0],
         [0, 1j]
     ])
     print(unitary_design_average(S, Pauli.group()))
+
+    # Twirl several observables with a single call
+    observables = np.array([S, S.H, S @ S])
+    print(batched_unitary_design_average(observables, Pauli.group()))
@@ -2,6 +2,9 @@ import numpy as np
 
 from scipy.stats import unitary_group as ug
 
+from haar import sample_haar_unitaries
+from monte_carlo import streaming_average
+
 # Limit the number of decimal digits to 2
 np.set_printoptions(precision = 2, suppress = True)
 
@@ -12,9 +15,34 @@ def monte_carlo_average(M, n_samples):
         R = R + (U @ M @ U.conj().T)
     return (1 / n_samples) * R
 
+def batched_monte_carlo_average(M, n_samples, chunk_size = 10_000, seed = None):
+    """Same estimate as `monte_carlo_average` but drawing the unitaries
+    in batches of at most `chunk_size` so memory use stays bounded.
+    """
+    rng = np.random.default_rng(seed)
+    M = np.asarray(M, dtype = complex)
+    R = np.zeros(M.shape, dtype = complex)
+    for start in range(0, n_samples, chunk_size):
+        U = sample_haar_unitaries(min(chunk_size, n_samples - start), M.shape[0], rng)
+        R = R + np.einsum("nij,jk,nlk->il", U, M, U.conj(), optimize = True)
+    return (1 / n_samples) * R
+
+def streaming_monte_carlo_average(M, max_samples, tolerance = None, confidence = None, seed = None):
+    """Streaming version of `batched_monte_carlo_average` which stops once
+    every entry of the estimate reaches the requested accuracy and also
+    returns the entrywise standard errors and the number of samples used.
+    """
+    M = np.asarray(M, dtype = complex)
+
+    def sample(size, rng):
+        U = sample_haar_unitaries(size, 2, rng)
+        return U @ M @ U.conj().transpose(0, 2, 1)
+
+    return streaming_average(sample, max_samples, tolerance, confidence, seed = seed)
+
 if __name__ == "__main__":
     S = np.matrix([
         [1, 0],
         [0, 1j]
     ])
-    print(monte_carlo_average(S, 50_000))
+    print(batched_monte_carlo_average(S, 50_000))
@@ -1,20 +1,43 @@
 import numpy as np
 
-def monte_carlo_average(f, sample_size):
+from integrand import evaluate
+from monte_carlo import randomized_qmc_average, streaming_average
+
+def sample_from_sphere(size, rng = np.random):
+    """Returns the x, y and z coordinate arrays of `size` random points."""
+    theta = rng.uniform(0, 2 * np.pi, size)
+    p = rng.uniform(-1, 1, size)
+    phi = np.arccos(p)
+    return (
+        np.sin(phi) * np.cos(theta),
+        np.sin(phi) * np.sin(theta),
+        np.cos(phi)
+    )
+
+def monte_carlo_average(f, sample_size, vectorized = True):
     """Compute the average of a function `f` over the unit sphere
+    In vectorized mode `f` receives whole coordinate arrays if it supports them.
     """
-    def sample_from_sphere(size):
-        theta = np.random.uniform(0, 2 * np.pi, size)
-        p = np.random.uniform(-1, 1, size)
-        phi = np.arccos(p)
-        return zip(
-            np.sin(phi) * np.cos(theta),
-            np.sin(phi) * np.sin(theta),
-            np.cos(phi)
-        )
+    coordinates = sample_from_sphere(sample_size)
+    if vectorized:
+        return np.mean(evaluate(f, *coordinates))
+    return np.mean([f(*sample) for sample in zip(*coordinates)])
 
-    return np.mean([f(*sample) for sample in sample_from_sphere(sample_size)])
+def points_on_sphere(u):
+    """Maps the (n, 2) points of the unit square to the x, y and z
+    coordinate arrays of n points spread evenly over the sphere.
+    """
+    theta = 2 * np.pi * u[:, 0]
+    phi = np.arccos(2 * u[:, 1] - 1)
+    return (
+        np.sin(phi) * np.cos(theta),
+        np.sin(phi) * np.sin(theta),
+        np.cos(phi)
+    )
 
 if __name__ == "__main__":
     f = lambda x, y, z: x**4
     print(monte_carlo_average(f, 100_000))
+    # Stop sampling once the standard error is below 1e-3
+    print(streaming_average(lambda size, rng: evaluate(f, *sample_from_sphere(size, rng)), 100_000, tolerance = 1e-3))
+    print(randomized_qmc_average(lambda u: evaluate(f, *points_on_sphere(u)), 2, 4_096))
@@ -1,6 +1,17 @@
+import os
 import numpy as np
 import numpy.linalg as la
 
+from functools import lru_cache
+from math import ceil, prod
+from scipy.optimize import minimize
+
+from cache import load_or_build_npy
+from integrand import evaluate
+
+# Optimized designs are saved to disk so that later runs only need to load them
+DESIGN_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".design_cache")
+
 def tetrahedron():
     """The tetrahedron as a spherical 2-design."""
     coordinates = np.array([
@@ -45,10 +56,162 @@ def icosahedron():
         [point / la.norm(point) for point in coordinates]
     )
 
-def spherical_design_average(f, points):
+def sphere_monomials(t):
+    """Returns the exponents (a, b, c) of every monomial x^a y^b z^c of degree
+    at most t together with its exact average over the unit sphere.
+    """
+    def double_factorial(n):
+        return prod(range(n, 0, -2))
+
+    exponents = np.array([
+        (a, b, c)
+        for a in range(t + 1) for b in range(t + 1 - a) for c in range(t + 1 - a - b)
+    ])
+    averages = np.array([
+        0.0 if a % 2 or b % 2 or c % 2 else
+        double_factorial(a - 1) * double_factorial(b - 1) * double_factorial(c - 1) / double_factorial(a + b + c + 1)
+        for a, b, c in exponents
+    ])
+    return exponents, averages
+
+def design_residual(points, t):
+    """Returns the error the design makes on the average of every monomial
+    of degree at most t and the Jacobian of these errors with respect to
+    the points, restricted to moves tangent to the sphere.
+    """
+    exponents, averages = sphere_monomials(t)
+    n_points = len(points)
+    degrees = np.arange(t + 1)[np.newaxis, :, np.newaxis]
+    powers = points[:, np.newaxis, :]**degrees
+    derivatives = degrees * points[:, np.newaxis, :]**np.maximum(degrees - 1, 0)
+
+    a, b, c = exponents.T
+    x, y, z = powers[:, a, 0], powers[:, b, 1], powers[:, c, 2]
+    residual = np.mean(x * y * z, axis = 0) - averages
+    gradient = np.stack([
+        derivatives[:, a, 0] * y * z,
+        x * derivatives[:, b, 1] * z,
+        x * y * derivatives[:, c, 2],
+    ], axis = 2) / n_points
+    gradient = gradient - np.einsum("nmk,nk->nm", gradient, points)[:, :, np.newaxis] * points[:, np.newaxis, :]
+    return residual, gradient.transpose(1, 0, 2).reshape(len(exponents), 3 * n_points)
+
+def is_spherical_design(points, t, tolerance = 1e-12):
+    """Certifies that `points` average every polynomial of degree at most t
+    exactly, by checking all the monomials up to `tolerance`.
+    """
+    residual, _ = design_residual(np.asarray(points), t)
+    return np.max(np.abs(residual)) <= tolerance
+
+def design_energy(y, t):
+    """The energy sum_(l=1..t) (2l+1)/N^2 sum_(i,j) P_l(x_i . x_j) of the points
+    x_i = y_i / |y_i| and its gradient. By the addition theorem it is a sum of
+    squares of spherical harmonic averages, so it vanishes exactly on t-designs.
+    """
+    Y = y.reshape(-1, 3)
+    n_points = len(Y)
+    norms = la.norm(Y, axis = 1, keepdims = True)
+    X = Y / norms
+    G = np.clip(X @ X.T, -1, 1)
+
+    # Legendre polynomials P_l(G) and their derivatives by recurrence
+    P_previous, P = np.ones_like(G), G
+    dP_previous, dP = np.zeros_like(G), np.ones_like(G)
+    energy, weights = 3 * P.sum(), 3 * dP
+    for l in range(1, t):
+        P_previous, P = P, ((2 * l + 1) * G * P - l * P_previous) / (l + 1)
+        dP_previous, dP = dP, dP_previous + (2 * l + 1) * P_previous
+        energy += (2 * l + 3) * P.sum()
+        weights += (2 * l + 3) * dP
+
+    gradient = 2 * weights @ X
+    gradient = (gradient - np.sum(gradient * X, axis = 1, keepdims = True) * X) / norms
+    return energy / n_points**2, gradient.ravel() / n_points**2
+
+def optimized_spherical_design(t, n_points, seed = 0):
+    """Searches for a spherical t-design with `n_points` points by minimizing
+    the design energy from random points, then polishes the result with
+    Gauss-Newton steps on the monomial averages.
+    """
+    rng = np.random.default_rng(seed)
+    result = minimize(
+        design_energy,
+        rng.standard_normal(3 * n_points),
+        args = (t,),
+        jac = True,
+        method = "L-BFGS-B",
+        options = {"maxiter": 10_000, "gtol": 1e-16, "ftol": 1e-30}
+    )
+    points = result.x.reshape(n_points, 3)
+    points = points / la.norm(points, axis = 1, keepdims = True)
+
+    for _ in range(10):
+        residual, jacobian = design_residual(points, t)
+        if np.max(np.abs(residual)) <= 1e-15:
+            break
+        try:
+            step = la.lstsq(jacobian, -residual, rcond = None)[0]
+        except la.LinAlgError:
+            # The polish diverged, the caller rejects these points
+            break
+        points = points + step.reshape(n_points, 3)
+        points = points / la.norm(points, axis = 1, keepdims = True)
+
+    return points
+
+def search_spherical_design(t):
+    """Searches for a spherical t-design with as few points as possible by
+    trying increasing point counts from t^2 / 2, close to the conjectured
+    minimum, and falling back to (t + 1)^2 points, for which designs are
+    known to exist. The count found is small but not guaranteed minimal.
+    """
+    for n_points in range(ceil(t**2 / 2), (t + 1)**2):
+        for seed in range(2):
+            points = optimized_spherical_design(t, n_points, seed)
+            if is_spherical_design(points, t):
+                return points
+
+    for seed in range(5):
+        points = optimized_spherical_design(t, (t + 1)**2, seed)
+        if is_spherical_design(points, t):
+            return points
+    raise RuntimeError(f"Could not find a spherical {t}-design")
+
+@lru_cache(maxsize = None)
+def spherical_design(t):
+    """Returns a read-only array of points forming a spherical t-design.
+
+    Up to t = 5 these are the vertices of the polyhedra above. Beyond that
+    the points come from `search_spherical_design` and are saved to disk.
+    Both the saved and the freshly found points are certified with
+    `is_spherical_design`, and saved points which fail are searched again.
+    """
+    if t < 1:
+        raise ValueError("The strength of the design must be at least 1")
+
+    if t <= 2:
+        points = tetrahedron()
+    elif t == 3:
+        points = cube()
+    elif t <= 5:
+        points = icosahedron()
+    else:
+        path = os.path.join(DESIGN_CACHE_DIRECTORY, f"spherical_{t}.npy")
+        points = load_or_build_npy(
+            path,
+            lambda: search_spherical_design(t),
+            lambda points: points.ndim == 2 and points.shape[1] == 3 and is_spherical_design(points, t)
+        )
+
+    points.setflags(write = False)
+    return points
+
+def spherical_design_average(f, points, vectorized = True):
     """Computes the average of a function `f` using the spherical
     t-design provided as `points`, specifically polyhedra vertex corners.
     """
+    if vectorized:
+        return np.mean(evaluate(f, *np.transpose(points)))
     return np.mean([f(*point) for point in points])
 
 if __name__ == "__main__":
@@ -63,3 +226,8 @@ if __name__ == "__main__":
     print(f"f2 average using 2-design: {spherical_design_average(f2, tetrahedron())}")
     print(f"f2 average using 3-design: {spherical_design_average(f2, cube())}")
     print(f"f2 average using 5-design: {spherical_design_average(f2, icosahedron())}")
+
+    f3 = lambda x, y, z: x**8 + (x**2)*(y**4)*(z**2)
+    print("\nWe expect the average to work starting with the 8-design:")
+    for t in range(5, 10):
+        print(f"f3 average using {t}-design: {spherical_design_average(f3, spherical_design(t))}")
@@ -1,35 +1,19 @@
-import pennylane as qml
+import numpy as np
 
 from scipy.stats import unitary_group as ug
 
+from fidelity import X, analytic_swap_test, counts_fidelity, n_shots, swap_test_circuit
+from haar import sample_haar_unitaries
+from monte_carlo import streaming_average
+from parallel import parallel_sum, seeded_swap_test_sum, split
+
 def swap_test(state_prep_unitary):
-    n_shots = 50_000
-    dev = qml.device(
-        "default.qubit",
-        wires = 3,
-        shots = n_shots
-    )
-
-    @qml.qnode(dev)
-    def swap_test_circuit():
-        # Prepare the state |psi> on qubit 1
-        qml.QubitUnitary(state_prep_unitary, wires = 1)
-
-        # Prepare the state X|psi> on qubit 2
-        qml.QubitUnitary(state_prep_unitary, wires = 2)
-        qml.PauliX(wires = 2)
-
-        # Perform the SWAP test
-        qml.Hadamard(wires = 0)
-        qml.CSWAP(wires = [0, 1, 2])
-        qml.Hadamard(wires = 0)
-
-        # Making sure to collect statistics of qubit 0
-        return qml.counts(qml.PauliZ(0))
-
-    dist = swap_test_circuit()
-    one_state_count = dist[-1] if -1 in dist else 0
-    return 1 - (2 / n_shots) * one_state_count
+    return counts_fidelity(swap_test_circuit(state_prep_unitary), n_shots)
+
+def swap_test_states(state_prep_unitary):
+    # The states |psi> and X|psi> that `swap_test` compares, also for a stack of unitaries
+    psi = np.asarray(state_prep_unitary)[..., :, 0]
+    return psi, psi @ X.T
 
 def monte_carlo_average(f, sample_size):
     total = 0
@@ -40,5 +24,25 @@ def monte_carlo_average(f, sample_size):
 
     return total / sample_size
 
+def haar_swap_test_block(block_size, rng):
+    # The Haar random unitaries are drawn from the same stream as the shots
+    return seeded_swap_test_sum(swap_test_circuit, (sample_haar_unitaries(block_size, 2, rng),), rng)
+
+def parallel_monte_carlo_average(sample_size, block_size = 250, seed = None, max_workers = None):
+    """Parallel version of `monte_carlo_average` with the SWAP test, run
+    in a pool of worker processes. The result only depends on `seed` and
+    `block_size`.
+    """
+    blocks = [len(block) for block in split(range(sample_size), block_size)]
+    return parallel_sum(haar_swap_test_block, blocks, seed, max_workers) / sample_size
+
 if __name__ == "__main__":
     print(monte_carlo_average(swap_test, 5_000))
+    print(monte_carlo_average(lambda U: analytic_swap_test(*swap_test_states(U)), 5_000))
+    # Stop sampling once the standard error is below 1e-3
+    print(streaming_average(
+        lambda size, rng: analytic_swap_test(*swap_test_states(sample_haar_unitaries(size, 2, rng))),
+        100_000,
+        tolerance = 1e-3
+    ))
+    print(parallel_monte_carlo_average(5_000, seed = 0))
@@ -1,6 +1,9 @@
 import numpy as np
 import pennylane as qml
 
+from fidelity import X, analytic_swap_test, counts_fidelity, n_shots, swap_test_circuit, unitary_prep
+from parallel import parallel_sum, split, swap_test_block
+
 def zero(wire):
     # This non-circuit prepares the |0> state
     pass
@@ -30,39 +33,45 @@ def minus_i(wire):
     qml.S(wires = wire)
 
 def swap_test(state_prep_gate):
-    n_shots = 50_000
-    dev = qml.device(
-        "default.qubit",
-        wires = 3,
-        shots = n_shots
-    )
-
-    @qml.qnode(dev)
-    def swap_test_circuit():
-        # Prepare the state |psi> on qubit 1
-        state_prep_gate(1)
-        
-        # Prepare the state X|psi> on qubit 2
-        state_prep_gate(2)
-        qml.PauliX(wires = 2)
+    return counts_fidelity(swap_test_circuit(unitary_prep(state_prep_gate)), n_shots)
 
-        # Perform the SWAP test
-        qml.Hadamard(wires = 0)
-        qml.CSWAP(wires = [0, 1, 2])
-        qml.Hadamard(wires = 0)
+def swap_test_states(state_prep_gate):
+    # The states |psi> and X|psi> that `swap_test` compares
+    psi = unitary_prep(state_prep_gate)[:, 0]
+    return psi, X @ psi
 
-        # Making sure to collect statistics of qubit 0
-        return qml.counts(qml.PauliZ(0))
+def broadcast_swap_test(state_prep_gates):
+    """Runs `swap_test` for every preparation gate with a single broadcast
+    execution of the circuit on their stacked unitaries and returns the fidelities.
+    """
+    return counts_fidelity(swap_test_circuit(unitary_prep(state_prep_gates)), n_shots)
 
-    dist = swap_test_circuit()
-    one_state_count = dist[-1] if -1 in dist else 0
-    return 1 - (2 / n_shots) * one_state_count
-
-def state_design_average(f, states):
+def state_design_average(f, states, broadcast = False):
+    """Averages `f` over the states. In broadcast mode `f` receives
+    all of them at once, as `broadcast_swap_test` expects.
+    """
+    if broadcast:
+        return np.mean(f(states))
     return np.mean([f(state) for state in states])
 
+def parallel_state_design_average(states, block_size = 2, seed = None, max_workers = None):
+    """Averages the SWAP test over the states in a pool of worker
+    processes. The result only depends on `seed` and `block_size`.
+    """
+    state_prep_unitaries = list(unitary_prep(states))
+    blocks = [(block, None) for block in split(state_prep_unitaries, block_size)]
+    return parallel_sum(swap_test_block, blocks, seed, max_workers) / len(states)
+
 if __name__ == "__main__":
     print(state_design_average(
         swap_test,
         [zero, one, plus, minus, plus_i, minus_i]
     ))
+    print(state_design_average(
+        lambda state: analytic_swap_test(*swap_test_states(state)),
+        [zero, one, plus, minus, plus_i, minus_i]
+    ))
+    print(parallel_state_design_average(
+        [zero, one, plus, minus, plus_i, minus_i],
+        seed = 0
+    ))
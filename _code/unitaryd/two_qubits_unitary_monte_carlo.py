@@ -2,6 +2,9 @@ import numpy as np
 
 from scipy.stats import unitary_group as ug
 
+from haar import sample_haar_unitaries
+from monte_carlo import streaming_average
+
 # Limit the number of decimal digits to 2
 np.set_printoptions(precision = 2, suppress = True)
 
@@ -14,6 +17,38 @@ def monte_carlo_average(M, n_samples):
             R = R + (np.kron(U_i, U_j) @ M @ np.kron(U_i, U_j).conj().T)
     return (1 / n_samples**2) * R
 
+def batched_monte_carlo_average(M, n_samples, chunk_size = 10_000, seed = None):
+    """Estimates the same local twirl as `monte_carlo_average` from `n_samples`
+    independent pairs (U_i, U_j) rather than from all n_samples^2 combinations
+    of two lists, drawing the pairs in batches of at most `chunk_size`.
+    """
+    rng = np.random.default_rng(seed)
+    M = np.asarray(M, dtype = complex)
+    R = np.zeros(M.shape, dtype = complex)
+    for start in range(0, n_samples, chunk_size):
+        size = min(chunk_size, n_samples - start)
+        U_i = sample_haar_unitaries(size, 2, rng)
+        U_j = sample_haar_unitaries(size, 2, rng)
+        # Batched Kronecker products of the pairs
+        U = np.einsum("nab,ncd->nacbd", U_i, U_j).reshape(size, 4, 4)
+        R = R + np.einsum("nij,jk,nlk->il", U, M, U.conj(), optimize = True)
+    return (1 / n_samples) * R
+
+def streaming_monte_carlo_average(M, max_samples, tolerance = None, confidence = None, seed = None):
+    """Streaming version of `batched_monte_carlo_average` which stops once
+    every entry of the estimate reaches the requested accuracy and also
+    returns the entrywise standard errors and the number of samples used.
+    """
+    M = np.asarray(M, dtype = complex)
+
+    def sample(size, rng):
+        U_i = sample_haar_unitaries(size, 2, rng)
+        U_j = sample_haar_unitaries(size, 2, rng)
+        U = np.einsum("nab,ncd->nacbd", U_i, U_j).reshape(size, 4, 4)
+        return U @ M @ U.conj().transpose(0, 2, 1)
+
+    return streaming_average(sample, max_samples, tolerance, confidence, seed = seed)
+
 if __name__ == "__main__":
     CNOT = np.matrix([
         [1, 0, 0, 0],
@@ -23,4 +58,4 @@ if __name__ == "__main__":
     ])
     # We know the resulting matrix is real
     # so we make sure to take only the real parts of each entry
-    print(monte_carlo_average(CNOT, 1_000).real)
+    print(batched_monte_carlo_average(CNOT, 1_000_000).real)
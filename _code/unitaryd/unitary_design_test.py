@@ -1,145 +1,22 @@
+import os
 import numpy as np
-import scipy.linalg as la
 import itertools as it
 
-from collections import deque
-from typing import List, Tuple
+from functools import lru_cache, reduce
+from math import factorial, prod
 
-class Permutation:
-    def __init__(self, n_qubits: int):
-        if n_qubits < 1:
-            raise ValueError("The number of qubits must be at least 1")
-        self.n_qubits = n_qubits
-    
-    def get_basis_set(self):
-        single_qubit_basis = ['0', '1']
-        new_basis = single_qubit_basis
-        temp_basis = []
-        for _ in range(self.n_qubits - 1):
-            for r in it.product(new_basis, single_qubit_basis):
-                temp_basis.append(r[0] + r[1])
-            new_basis = temp_basis
-            temp_basis = []
-        return new_basis
-    
-    def get_permutation_list(self, order: List) -> List[Tuple]:
-        if len(order) != self.n_qubits:
-            raise ValueError("The order list must have the same length as the number of qubits to permute")
-
-        if len(set(order)) != self.n_qubits:
-            raise ValueError("The order list cannot contain duplicate items")
-        
-        permutations = []
-        basis = self.get_basis_set()
-        
-        for basis_element in basis:
-            new_element = list(basis_element)
-            old_element = list(basis_element)
-            for old_index, new_index in enumerate(order):
-                if new_index < 1 or new_index > self.n_qubits:
-                    raise ValueError(f"Item {new_index} at index {old_index} in order list is out of bounds")
-                new_element[old_index] = old_element[new_index - 1]
-            permutations.append((basis_element, ''.join(new_element)))
-            
-        return permutations
-
-    def get_permutation_matrix(self, order: List) -> np.ndarray:
-        permutations = self.get_permutation_list(order)
-        dim = len(permutations)
-        permutation_matrix = np.zeros((dim, dim))
-        
-        for perm in permutations:
-            x = int(perm[0], 2)
-            y = int(perm[1], 2)
-            permutation_matrix[x][y] = 1
-        
-        return permutation_matrix
-
-def matrix_in_list(element, list):
-    for list_element in list:
-        if np.allclose(list_element, element):
-            return True
-    return False
-
-def matrix_is_normalizer(x):
-    pauli_group = Pauli.group()
-    for pauli in pauli_group:
-        p = x @ pauli @ x.conj().T
-        if matrix_in_list(p, pauli_group):
-            return True
-    return False
-
-class Pauli:
-    @staticmethod
-    def generators():
-        X = np.matrix([
-            [0, 1],
-            [1, 0]
-        ])
-        Y = np.matrix([
-            [ 0, -1j],
-            [1j,   0]
-        ])
-        Z = np.matrix([
-            [1,  0],
-            [0, -1]
-        ])
-
-        return [X, Y, Z]
-
-    @staticmethod
-    def group():
-        group = Pauli.generators()
-        group.append(
-            np.matrix([
-                [1, 0],
-                [0, 1]
-            ])
-        )
-    
-        return group
-
-class Clifford:
-    @staticmethod
-    def generators():
-        H = (1/np.sqrt(2)) * np.matrix([
-            [1,  1],
-            [1, -1]
-        ], dtype = complex)
-
-        S = np.matrix([
-            [1,  0],
-            [0, 1j]
-        ], dtype = complex)
-
-        return [H, S]
-
-    @staticmethod
-    def group():
-        group = []
-        queue = deque()
-        queue.append(
-            np.matrix([
-                [1, 0],
-                [0, 1]
-            ])
-        )
+from clifford_group import Pauli, Clifford
+from cache import load_or_build_npy
+from clifford_tableau import CliffordTableau
+from monte_carlo import streaming_average
+from permutation import Permutation
 
-        while queue:
-            x = queue.popleft()
-            global_phase = 1 / np.emath.sqrt(la.det(x))
-            x = x * global_phase
+# Haar moment operators are saved to disk so that later runs only need to load them
+MOMENT_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".moment_cache")
 
-            # We need to account for a matrix with a negated phase
-            if matrix_in_list(x, group) or matrix_in_list(-x, group):
-                continue
-
-            if matrix_is_normalizer(x):
-                group.append(x)
-                for clifford in Clifford.generators():
-                    queue.append(x @ clifford)
-    
-        return group
+# The moment operators are dense matrices on 2 t n_qubits qubits, 10 qubits
+# already take 8 MB and every further qubit multiplies that by four
+MAX_MOMENT_OPERATOR_QUBITS = 10
 
 def is_unitary_1_design(group):
     R = np.asmatrix(np.zeros((4,4)))
@@ -172,6 +49,149 @@ def is_unitary_2_design(group):
         (P_3412 + P_4321) / 3 - (P_4312 + P_3421) / 6
     )
 
+def weingarten_matrix(t, d):
+    """Returns the permutations of t elements and the Weingarten matrix,
+    the pseudo-inverse of the Gram matrix d^#cycles(s^-1 t) of their
+    permutation operators, which handles d < t where these are dependent.
+    """
+    def cycle_count(permutation):
+        seen = set()
+        count = 0
+        for start in range(len(permutation)):
+            if start not in seen:
+                count += 1
+                while start not in seen:
+                    seen.add(start)
+                    start = permutation[start]
+        return count
+
+    permutations = list(it.permutations(range(t)))
+    inverses = [tuple(np.argsort(p)) for p in permutations]
+    gram = np.array([
+        [float(d)**cycle_count(tuple(s_inverse[p] for p in tau)) for tau in permutations]
+        for s_inverse in inverses
+    ])
+    return permutations, np.linalg.pinv(gram)
+
+@lru_cache(maxsize = None)
+def haar_moment_operator(t, n_qubits = 1):
+    """The Haar average of U^(x t) x U^dagger^(x t) over n-qubit unitaries.
+
+    It is a combination of permutation operators on the 2t tensor factors
+    weighted by the Weingarten function: the pair of permutations (s, tau)
+    sends factor a to factor t + s(a) and factor t + b to tau^-1(b).
+    The operator is returned read-only since it is shared between calls.
+    """
+    if 2 * t * n_qubits > MAX_MOMENT_OPERATOR_QUBITS:
+        raise ValueError(
+            f"The moment operator of t = {t} on {n_qubits} qubits acts on {2 * t * n_qubits} qubits, "
+            f"at most {MAX_MOMENT_OPERATOR_QUBITS} are supported."
+        )
+    d = 2**n_qubits
+    path = os.path.join(MOMENT_CACHE_DIRECTORY, f"haar_{t}_{d}.npy")
+    R = load_or_build_npy(path, lambda: build_haar_moment_operator(t, n_qubits))
+    R.setflags(write = False)
+    return R
+
+def build_haar_moment_operator(t, n_qubits):
+    d = 2**n_qubits
+    permutations, weingarten = weingarten_matrix(t, d)
+    # Weingarten values shrink like d^(-t) so negligible ones are judged
+    # relative to the largest one rather than with an absolute tolerance
+    negligible = 1e-12 * np.abs(weingarten).max()
+    R = np.zeros((d**(2 * t), d**(2 * t)))
+    rows = np.arange(d**(2 * t))
+    for i, sigma in enumerate(permutations):
+        for j, tau in enumerate(permutations):
+            if np.abs(weingarten[i, j]) <= negligible:
+                continue
+            tau_inverse = np.argsort(tau)
+            destination = [t + sigma[a] for a in range(t)] + [tau_inverse[b] for b in range(t)]
+            source = np.argsort(destination)
+            # Each factor is made of n_qubits qubits permuted together
+            order = [
+                source[factor // n_qubits] * n_qubits + factor % n_qubits + 1
+                for factor in range(2 * t * n_qubits)
+            ]
+            R[rows, Permutation(2 * t * n_qubits).get_permutation_indices(order)] += weingarten[i, j]
+    return R
+
+def is_unitary_t_design(group, t, n_qubits = 1):
+    """Compares the average of U^(x t) x U^dagger^(x t) over the group
+    with its Haar value, generalizing the checks above to any t and
+    number of qubits. The operators have dimension 2^(2 t n_qubits).
+    """
+    # Fetched first so that unsupported sizes fail before allocating R
+    haar = haar_moment_operator(t, n_qubits)
+    R = np.zeros((2**(2 * t * n_qubits),) * 2, dtype = complex)
+    for element in group:
+        element = np.asarray(element)
+        R = R + reduce(np.kron, [element] * t + [element.conj().T] * t)
+
+    F = (1 / len(group)) * R
+    return np.allclose(F, haar)
+
+def haar_frame_potential(t, d):
+    """The frame potential of the Haar measure, the integral of |Tr U|^2t.
+
+    It counts the permutations of t elements without an increasing
+    subsequence longer than d, that is the sum of (f^lambda)^2 over the
+    partitions lambda of t with at most d rows, where f^lambda is given
+    by the hook length formula.
+    """
+    def partitions(n, largest):
+        if n == 0:
+            yield ()
+            return
+        for first in range(min(n, largest), 0, -1):
+            for rest in partitions(n - first, first):
+                yield (first,) + rest
+
+    def hook_length_dimension(partition):
+        columns = [sum(1 for row in partition if row > j) for j in range(partition[0])]
+        hooks = prod(
+            (row - j - 1) + (columns[j] - i - 1) + 1
+            for i, row in enumerate(partition) for j in range(row)
+        )
+        return factorial(t) // hooks
+
+    return sum(
+        hook_length_dimension(partition)**2
+        for partition in partitions(t, t) if len(partition) <= d
+    )
+
+def frame_potential(group, t, chunk_size = 1024):
+    """Computes (1/|G|^2) sum over all pairs U, V of |Tr(U^dagger V)|^2t.
+
+    The traces are the entries of the Gram matrix of the flattened elements,
+    which is built one block of `chunk_size` rows at a time to bound memory.
+    """
+    elements = np.asarray(group, dtype = complex)
+    flattened = elements.reshape(len(elements), -1)
+    total = 0.0
+    for start in range(0, len(flattened), chunk_size):
+        traces = flattened[start:start + chunk_size].conj() @ flattened.T
+        total += np.sum(np.abs(traces)**(2 * t))
+    return total / len(flattened)**2
+
+def sampled_frame_potential(sample, t, max_samples, tolerance = None, seed = None):
+    """Estimates the frame potential of the ensemble drawn by `sample(size, rng)`,
+    which returns a (size, d, d) array, from independent pairs of elements.
+    This covers groups too large to go through all the pairs.
+    """
+    def traces(size, rng):
+        U, V = sample(size, rng), sample(size, rng)
+        return np.abs(np.einsum("nij,nij->n", U.conj(), V))**(2 * t)
+
+    return streaming_average(traces, max_samples, tolerance, seed = seed)
+
+def is_unitary_t_design_by_frame_potential(group, t):
+    """The frame potential of an ensemble is at least the Haar one,
+    with equality exactly when the ensemble is a unitary t-design.
+    """
+    d = np.asarray(group[0]).shape[0]
+    return np.isclose(frame_potential(group, t), haar_frame_potential(t, d))
+
 if __name__ == "__main__":
     print("Clifford group is 2-design:",
         is_unitary_2_design(Clifford.group()))
@@ -182,3 +202,22 @@ if __name__ == "__main__":
         is_unitary_2_design(Pauli.group()))
     print("Pauli group is 1-design:",
         is_unitary_1_design(Pauli.group()))
+
+    for t in range(1, 5):
+        print(f"Clifford group is {t}-design:",
+            is_unitary_t_design(Clifford.group(), t))
+    print("Two-qubit Clifford group is 2-design:",
+        is_unitary_t_design(Clifford.group(2), 2, n_qubits = 2))
+
+    for t in range(1, 5):
+        print(f"Clifford group is {t}-design (frame potential):",
+            is_unitary_t_design_by_frame_potential(Clifford.group(), t))
+    print("Two-qubit Clifford group is 2-design (frame potential):",
+        is_unitary_t_design_by_frame_potential(Clifford.group(2), 2))
+
+    estimate = sampled_frame_potential(
+        lambda size, rng: np.array([CliffordTableau.random(2, rng).to_unitary() for _ in range(size)]),
+        2, 5_000, seed = 1
+    )
+    print(f"Sampled two-qubit Clifford frame potential: {estimate.mean:.2f} +/- {estimate.stderr:.2f},",
+        f"Haar value: {haar_frame_potential(2, 4)}")
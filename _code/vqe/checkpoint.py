@@ -0,0 +1,158 @@
+import json
+import os
+import time
+
+import pennylane as qml
+import pennylane.numpy as np
+
+CHECKPOINT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".vqe_checkpoints")
+
+def get_rng_state(rng):
+    """The state of NumPy's global generator, which SPSA perturbs the
+    parameters with, and of `rng`, the generator the device was seeded with.
+    """
+    name, keys, position, has_gauss, cached_gaussian = np.random.get_state()
+    return {
+        "global": [name, keys.tolist(), position, has_gauss, cached_gaussian],
+        "device": None if rng is None else rng.bit_generator.state,
+    }
+
+def set_rng_state(rng, state):
+    name, keys, position, has_gauss, cached_gaussian = state["global"]
+    np.random.set_state((name, np.array(keys, dtype = np.uint32), position, has_gauss, cached_gaussian))
+    if rng is not None:
+        rng.bit_generator.state = state["device"]
+
+def write_atomically(path, text):
+    # Write a temporary file and rename it so an interruption never leaves a truncated file
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w") as file:
+        file.write(text)
+    os.replace(temporary_path, path)
+
+def write_log(log_path, entries):
+    write_atomically(log_path, "".join(json.dumps(entry) + "\n" for entry in entries))
+
+def read_log(log_path, next_iteration):
+    """Reads the log entries before `next_iteration`. Only if the log goes
+    past the checkpoint, or ends with a line cut short by an interruption,
+    is it rewritten without the extra entries; otherwise it is left as is
+    and the resumed run appends to it.
+    """
+    entries = []
+    truncated = False
+    if os.path.exists(log_path):
+        with open(log_path) as log:
+            for line in log:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    truncated = True
+                    break
+                if entry["iteration"] >= next_iteration:
+                    truncated = True
+                    break
+                entries.append(entry)
+    if truncated:
+        write_log(log_path, entries)
+    return entries
+
+def checkpointed_vqe(cost, params, maxiter, name, device, rng = None, checkpoint_every = 10, directory = CHECKPOINT_DIRECTORY):
+    """Version of `vqe` which streams every iteration to the JSONL log
+    `<name>.jsonl` in `directory`, by default `.vqe_checkpoints` next to this
+    file, and snapshots the optimizer every `checkpoint_every` iterations
+    to `<name>.json`.
+
+    The entry of iteration k holds the parameters before the k-th step, the
+    energy measured at them during that step, the total number of shots spent
+    on `device` so far and the total wall time; a last entry holds the final
+    parameters and their energy.
+
+    If a checkpoint exists the run resumes from it, restoring the optimizer
+    step and the random states of NumPy and of `rng`, the generator `device`
+    was created with as `seed`, so that it continues exactly like an
+    uninterrupted run would have; the log entries written after the checkpoint
+    are dropped. A finished run resumes at its end and only measures the
+    final energy again. Resuming with other initial parameters or another
+    `maxiter` raises an error. Without `rng` the shot noise is not restored.
+    """
+    os.makedirs(directory, exist_ok = True)
+    log_path = os.path.join(directory, f"{name}.jsonl")
+    checkpoint_path = os.path.join(directory, f"{name}.json")
+    init_params = np.array(params).tolist()
+
+    optimizer = qml.SPSAOptimizer(maxiter = maxiter)
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as file:
+            checkpoint = json.load(file)
+        if checkpoint["maxiter"] != maxiter or checkpoint["init_params"] != init_params:
+            raise ValueError(
+                f"The checkpoint {checkpoint_path} belongs to a run with other initial parameters "
+                "or another maxiter, delete it or choose another name."
+            )
+        start = checkpoint["iteration"]
+        print(f"Resuming {name} from step {start} of {maxiter} saved in {checkpoint_path}")
+        params = np.array(checkpoint["params"], requires_grad = True)
+        optimizer.k = checkpoint["k"]
+        shots = checkpoint["shots"]
+        elapsed = checkpoint["wall_time"]
+        set_rng_state(rng, checkpoint["rng_state"])
+        history = [entry["energy"] for entry in read_log(log_path, start)]
+    else:
+        start = 0
+        shots = 0
+        elapsed = 0
+        history = []
+        write_log(log_path, [])
+
+    with open(log_path, "a") as log:
+        def record(iteration, params, energy, shots, elapsed):
+            log.write(json.dumps({
+                "iteration": iteration,
+                "params": params.tolist(),
+                "energy": energy,
+                "shots": shots,
+                "wall_time": elapsed
+            }) + "\n")
+            log.flush()
+            history.append(energy)
+
+        for iter in range(start, maxiter):
+            started = time.perf_counter()
+            with qml.Tracker(device) as tracker:
+                # The energy is measured at the parameters before the step
+                new_params, energy = optimizer.step_and_cost(
+                    cost,
+                    params
+                )
+            shots += tracker.totals.get("shots", 0)
+            elapsed += time.perf_counter() - started
+            record(iter, params, float(energy), shots, elapsed)
+            params = new_params
+
+            # Print the optimizer progress every 40 steps
+            if iter % 40 == 0:
+                print(f"Step = {iter},  Energy = {history[-1]:.8f}")
+
+            if (iter + 1) % checkpoint_every == 0 or iter == maxiter - 1:
+                snapshot = json.dumps({
+                    "iteration": iter + 1,
+                    "params": params.tolist(),
+                    "init_params": init_params,
+                    "maxiter": maxiter,
+                    "k": optimizer.k,
+                    "shots": shots,
+                    "wall_time": elapsed,
+                    "rng_state": get_rng_state(rng)
+                })
+                write_atomically(checkpoint_path, snapshot)
+
+        # The energy of the final parameters
+        started = time.perf_counter()
+        with qml.Tracker(device) as tracker:
+            energy = float(cost(params))
+        shots += tracker.totals.get("shots", 0)
+        elapsed += time.perf_counter() - started
+        record(maxiter, params, energy, shots, elapsed)
+
+    return energy, history
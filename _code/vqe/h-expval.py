@@ -1,6 +1,8 @@
 import pennylane as qml
 from pennylane import numpy as np
 
+from hamiltonian import grouped_cost
+
 # We fix the seed to make results reproducible
 np.random.seed(1)
 
@@ -24,6 +26,12 @@ def z_expval(y):
 def h_expval(y):
     return (1/np.sqrt(2)) * (x_expval(y) + z_expval(y))
 
+def ry(y):
+    qml.RY(y, wires = 0)
+
+# X and Z do not commute so they still need one execution each
+grouped_h_expval = grouped_cost(ry, [(1/np.sqrt(2), "X"), (1/np.sqrt(2), "Z")], dev)
+
 @qml.qnode(dev)
 def hadamard_expval(y):
     qml.RY(y, wires = 0)
@@ -35,3 +43,4 @@ if __name__ == "__main__":
     print(custom_expval)
     print(builtin_expval)
     print(custom_expval == builtin_expval)
+    print(grouped_h_expval(np.pi))
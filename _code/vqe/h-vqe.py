@@ -2,18 +2,32 @@ import pennylane as qml
 from pennylane import numpy as np
 import matplotlib.pyplot as plt
 
+from hamiltonian import ShotPlanner
+
 dev = qml.device(
     "default.qubit",
     wires = 1,
     shots = 100000
 )
 
-@qml.qnode(dev)
-def hadamard_cost(theta):
+def ansatz(theta):
     qml.RY(theta[1], wires = 0)
     qml.PhaseShift(theta[0], wires = 0)
+
+@qml.qnode(dev)
+def hadamard_cost(theta):
+    ansatz(theta)
     return qml.expval(qml.Hadamard(0))
 
+# H = (X + Z) / sqrt(2) measured on a budget of 20,000 shots per evaluation
+# split between X and Z according to their estimated standard deviations
+planned_hadamard_cost = ShotPlanner(
+    ansatz,
+    [(1/np.sqrt(2), "X"), (1/np.sqrt(2), "Z")],
+    dev,
+    shots_per_evaluation = 20_000
+)
+
 def vqe(cost, theta, maxiter):
     optimizer = qml.SPSAOptimizer(maxiter = maxiter)
     energy = cost(theta)
@@ -47,6 +61,12 @@ if __name__ == "__main__":
     # Print the final energy
     print(energy)
 
+    # Run VQE with the shot budget split between the terms
+    planned_energy, _ = vqe(planned_hadamard_cost, init_theta, maxiter)
+    print(planned_energy)
+    print("Shots per term:", planned_hadamard_cost.shots)
+    print("Energy variance:", planned_hadamard_cost.energy_variance)
+
     # Plot the optimization history
     plt.figure(figsize=(10, 6))
     plt.plot(range(maxiter + 1), history, "go", ls = "dashed", label = "Energy")
@@ -0,0 +1,146 @@
+import numpy as np
+import pennylane as qml
+
+# A Hamiltonian is a weighted sum of Pauli words, written as a list of
+# (coefficient, word) terms where the k-th letter of the word acts on wire k.
+# For example XZ + IZ is [(1, "XZ"), (1, "IZ")].
+
+def qubit_wise_commute(word_1, word_2):
+    # On every wire the letters are equal or one of them is the identity
+    return all(a == "I" or b == "I" or a == b for a, b in zip(word_1, word_2))
+
+def merge_bases(word_1, word_2):
+    return "".join(b if a == "I" else a for a, b in zip(word_1, word_2))
+
+def qubit_wise_commuting_groups(terms):
+    """Greedily partitions the terms into groups of qubit-wise commuting
+    words and returns a list of (basis, terms) pairs, where `basis` is the
+    word whose eigenbasis diagonalizes every word of the group.
+    """
+    groups = []
+    for coefficient, word in terms:
+        for index, (basis, group_terms) in enumerate(groups):
+            if qubit_wise_commute(basis, word):
+                groups[index] = (merge_bases(basis, word), group_terms + [(coefficient, word)])
+                break
+        else:
+            groups.append((word, [(coefficient, word)]))
+    return groups
+
+def rotate_to_basis(basis):
+    # Map the eigenbasis of each letter onto the computational basis
+    for wire, pauli in enumerate(basis):
+        if pauli == "X":
+            qml.Hadamard(wires = wire)
+        elif pauli == "Y":
+            qml.adjoint(qml.S)(wires = wire)
+            qml.Hadamard(wires = wire)
+
+def eigenvalues(word):
+    """Eigenvalues of the word on the computational basis states once
+    rotated into its eigenbasis, in the order `qml.probs` uses.
+    """
+    values = np.ones(1)
+    for pauli in word:
+        values = np.kron(values, [1, 1] if pauli == "I" else [1, -1])
+    return values
+
+def group_observable(group_terms):
+    """Eigenvalues of the weighted sum of the terms of a group on the
+    computational basis states once rotated into the group basis.
+    """
+    return sum(coefficient * eigenvalues(word) for coefficient, word in group_terms)
+
+def group_circuit(ansatz, n_wires, device):
+    @qml.qnode(device)
+    def circuit(params, basis):
+        ansatz(params)
+        rotate_to_basis(basis)
+        return qml.probs(wires = range(n_wires))
+
+    return circuit
+
+def grouped_cost(ansatz, terms, device):
+    """Builds the energy cost function of the Hamiltonian for the ansatz.
+
+    Each group of qubit-wise commuting terms is measured with one execution
+    of the ansatz followed by the shared basis rotation, and the expectation
+    of every term of the group is computed from the same shot record.
+    """
+    groups = qubit_wise_commuting_groups(terms)
+    observables = [group_observable(group_terms) for _, group_terms in groups]
+    circuit = group_circuit(ansatz, len(terms[0][1]), device)
+
+    def cost(params):
+        energy = 0
+        for (basis, _), observable in zip(groups, observables):
+            energy = energy + np.dot(circuit(params, basis), observable)
+        return energy
+
+    return cost
+
+class ShotPlanner:
+    """Energy cost function of the Hamiltonian which splits a budget of
+    `shots_per_evaluation` shots between the groups of commuting terms.
+
+    A group gets shots in proportion to the standard deviation of its
+    weighted observable, which for a single term is |coefficient| * sigma.
+    The standard deviations are the running averages of the variances
+    estimated at the previous evaluations; before the first one the bound
+    sum |coefficient| is used instead. Every group gets at least `min_shots`
+    shots so that no variance estimate collapses to zero.
+
+    After each evaluation `energy_variance` holds the variance of the
+    energy estimate and `shots` the number of shots given to each group.
+    """
+    def __init__(self, ansatz, terms, device, shots_per_evaluation, min_shots = 100):
+        self.groups = qubit_wise_commuting_groups(terms)
+        if shots_per_evaluation < min_shots * len(self.groups):
+            raise ValueError(f"A budget of {shots_per_evaluation} shots cannot give {min_shots} shots to each of the {len(self.groups)} groups.")
+
+        self.observables = [group_observable(group_terms) for _, group_terms in self.groups]
+        self.circuit = group_circuit(ansatz, len(terms[0][1]), device)
+        self.shots_per_evaluation = shots_per_evaluation
+        self.min_shots = min_shots
+        self.bounds = np.array([
+            sum(abs(coefficient) for coefficient, _ in group_terms)
+            for _, group_terms in self.groups
+        ])
+        self.variance_sums = np.zeros(len(self.groups))
+        self.n_evaluations = 0
+        self.shots = None
+        self.energy_variance = None
+
+    @property
+    def sigmas(self):
+        if self.n_evaluations == 0:
+            return self.bounds
+        return np.sqrt(self.variance_sums / self.n_evaluations)
+
+    def allocate(self):
+        """Returns the number of shots of each group for the next evaluation."""
+        sigmas = self.sigmas
+        weights = sigmas / sigmas.sum() if sigmas.sum() > 0 else np.full(len(sigmas), 1 / len(sigmas))
+        spare = self.shots_per_evaluation - self.min_shots * len(self.groups)
+        shots = self.min_shots + np.floor(spare * weights).astype(int)
+        # Give the shots lost to rounding to the group with the largest weight
+        shots[np.argmax(weights)] += self.shots_per_evaluation - shots.sum()
+        return shots
+
+    def __call__(self, params):
+        shots = self.allocate()
+        energy = 0
+        energy_variance = 0
+        for index, ((basis, _), observable) in enumerate(zip(self.groups, self.observables)):
+            circuit = qml.set_shots(self.circuit, shots = int(shots[index]))
+            probs = circuit(params, basis)
+            mean = np.dot(probs, observable)
+            variance = max(np.dot(probs, observable**2) - mean**2, 0)
+            energy = energy + mean
+            energy_variance += variance / shots[index]
+            self.variance_sums[index] += variance
+
+        self.n_evaluations += 1
+        self.shots = shots
+        self.energy_variance = energy_variance
+        return energy
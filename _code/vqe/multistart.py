@@ -0,0 +1,55 @@
+import numpy as np
+
+def multistart_vqe(cost, init_params, maxiter, patience = 40, tolerance = 1e-3, n_final_evaluations = 10, alpha = 0.602, gamma = 0.101, c = 0.2, seed = None):
+    """Runs SPSA from the K rows of `init_params` in lockstep.
+
+    `cost` must accept parameters broadcast along a trailing axis, that is
+    a (n_params, batch) array, and return the batch of energies, which a QNode
+    whose ansatz reads `params[i]` does. Each step sends the 2K perturbed
+    parameter vectors of the active starts as one batch and uses the gain
+    sequences of `qml.SPSAOptimizer`. The mean of the two perturbed energies
+    is the history estimate of the energy before the step.
+
+    A start is pruned once its mean energy over the last `patience` steps
+    improves on the previous `patience` steps by less than `tolerance`; the
+    best start is never pruned. The final parameters of every start are
+    evaluated `n_final_evaluations` times in one batch, so that with shot
+    noise the winner is not merely the luckiest single evaluation. Returns
+    the best mean final energy, its parameters and the energy history of
+    every start.
+    """
+    rng = np.random.default_rng(seed)
+    params = np.array(init_params, dtype = float)
+    n_starts = len(params)
+    A = 0.1 * maxiter
+    a = 0.05 * (A + 1)**alpha
+
+    histories = [[energy] for energy in np.asarray(cost(params.T))]
+    active = np.ones(n_starts, dtype = bool)
+
+    for k in range(1, maxiter + 1):
+        a_k = a / (A + k)**alpha
+        c_k = c / k**gamma
+        starts = np.flatnonzero(active)
+
+        delta = rng.choice([-1, 1], size = (len(starts), params.shape[1]))
+        batch = np.vstack([params[starts] + c_k * delta, params[starts] - c_k * delta])
+        energies = np.asarray(cost(batch.T))
+        plus, minus = energies[:len(starts)], energies[len(starts):]
+        params[starts] -= a_k * (plus - minus)[:, None] / (2 * c_k * delta)
+
+        for start, energy in zip(starts, (plus + minus) / 2):
+            histories[start].append(energy)
+
+        # Prune the starts which stalled, keeping the current best one
+        if k >= 2 * patience:
+            recent = np.array([np.mean(histories[start][-patience:]) for start in starts])
+            previous = np.array([np.mean(histories[start][-2 * patience:-patience]) for start in starts])
+            stalled = previous - recent < tolerance
+            stalled[np.argmin(recent)] = False
+            active[starts[stalled]] = False
+
+    repeated_params = np.tile(params, (n_final_evaluations, 1))
+    final_energies = np.asarray(cost(repeated_params.T)).reshape(n_final_evaluations, n_starts).mean(axis = 0)
+    best = np.argmin(final_energies)
+    return final_energies[best], params[best], histories
@@ -0,0 +1,174 @@
+import numpy as np
+import pennylane as qml
+
+def ry(theta):
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    return np.array([[c, -s], [s, c]], dtype = complex)
+
+def d_ry(theta):
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    return 0.5 * np.array([[-s, -c], [c, -s]], dtype = complex)
+
+def rx(theta):
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    return np.array([[c, -1j * s], [-1j * s, c]])
+
+def d_rx(theta):
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    return 0.5 * np.array([[-s, -1j * c], [-1j * c, -s]])
+
+def phase_shift(phi):
+    return np.array([[1, 0], [0, np.exp(1j * phi)]])
+
+def d_phase_shift(phi):
+    return np.array([[0, 0], [0, 1j * np.exp(1j * phi)]])
+
+PAULI_X = np.array([[0, 1], [1, 0]], dtype = complex)
+
+# Every supported gate is a 2x2 matrix on its last wire, controlled by the
+# first one for two-wire gates: name -> (matrix, derivative, controlled)
+GATES = {
+    "RY": (ry, d_ry, False),
+    "PhaseShift": (phase_shift, d_phase_shift, False),
+    "PauliX": (lambda: PAULI_X, None, False),
+    "CRY": (ry, d_ry, True),
+    "CRX": (rx, d_rx, True),
+    "ControlledPhaseShift": (phase_shift, d_phase_shift, True),
+}
+
+class StatevectorSimulator:
+    """Exact simulator of an ansatz written with PennyLane gates among
+    RY, PhaseShift, PauliX, CRY, CRX and ControlledPhaseShift.
+
+    The ansatz is recorded once, and every gate angle must be an affine
+    function of the parameters, like `params[5] - params[3]`. The state lives
+    in preallocated buffers that are reused by every evaluation. Expectations
+    are taken of Hamiltonians given as (coefficient, word) terms, and their
+    gradients are computed by adjoint differentiation.
+    """
+    def __init__(self, ansatz, n_params, n_wires):
+        self.n_wires = n_wires
+        self.gates = []
+        offsets, coefficients = [], []
+
+        # Recording the ansatz on the columns [0, e_1, ..., e_n] gives every
+        # angle at the origin followed by its value along each parameter
+        basis = np.hstack([np.zeros((n_params, 1)), np.eye(n_params)])
+        for op in qml.tape.make_qscript(ansatz)(basis).operations:
+            if op.name not in GATES:
+                raise ValueError(f"The gate {op.name} is not supported by the simulator.")
+            matrix, derivative, controlled = GATES[op.name]
+            control = op.wires[0] if controlled else None
+            self.gates.append((matrix, derivative, control, op.wires[-1], len(op.data) > 0))
+            if op.data:
+                angles = np.asarray(op.data[0], dtype = float)
+                offsets.append(angles[0])
+                coefficients.append(angles[1:] - angles[0])
+
+        self.offsets = np.array(offsets)
+        self.coefficients = np.array(coefficients).reshape(len(offsets), n_params)
+
+        params = np.random.default_rng(0).normal(size = n_params)
+        recorded = [float(op.data[0]) for op in qml.tape.make_qscript(ansatz)(params).operations if op.data]
+        if not np.allclose(recorded, self.angles(params)):
+            raise ValueError("The gate angles must be affine functions of the parameters.")
+
+        shape = (2,) * n_wires
+        self.state = np.zeros(shape, dtype = complex)
+        self.adjoint_state = np.zeros(shape, dtype = complex)
+        self.derivative_state = np.zeros(shape, dtype = complex)
+        self.pauli_state = np.zeros(shape, dtype = complex)
+        self.scratch = np.zeros(2 ** n_wires, dtype = complex)
+
+    def angles(self, params):
+        return self.offsets + self.coefficients @ np.asarray(params, dtype = float)
+
+    def apply(self, matrix, state, target, control = None):
+        """Applies the 2x2 matrix to the target wire of the state in place,
+        only on the states where the control wire is |1> if there is one.
+        """
+        # Length one slices keep a and b views even on two wires
+        index = [slice(None)] * self.n_wires
+        if control is not None:
+            index[control] = slice(1, 2)
+        index[target] = slice(0, 1)
+        a = state[tuple(index)]
+        index[target] = slice(1, 2)
+        b = state[tuple(index)]
+
+        t0 = self.scratch[:a.size].reshape(a.shape)
+        t1 = self.scratch[a.size:2 * a.size].reshape(a.shape)
+        np.multiply(a, matrix[0, 0], out = t0)
+        np.multiply(b, matrix[0, 1], out = t1)
+        t0 += t1
+        np.multiply(a, matrix[1, 0], out = t1)
+        b *= matrix[1, 1]
+        b += t1
+        a[...] = t0
+
+    def apply_derivative(self, derivative, state, target, control = None):
+        # The derivative of a controlled gate vanishes where the control is |0>
+        if control is not None:
+            index = [slice(None)] * self.n_wires
+            index[control] = 0
+            state[tuple(index)] = 0
+        self.apply(derivative, state, target, control)
+
+    def run(self, params):
+        """Prepares the state of the ansatz in the `state` buffer."""
+        self.state.fill(0)
+        self.state[(0,) * self.n_wires] = 1
+        angles = iter(self.angles(params))
+        for matrix, _, control, target, parametrized in self.gates:
+            self.apply(matrix(next(angles)) if parametrized else matrix(), self.state, target, control)
+        return self.state
+
+    def apply_hamiltonian(self, terms, state, out):
+        """Writes H|state> into `out`."""
+        out.fill(0)
+        for coefficient, word in terms:
+            self.pauli_state[...] = state
+            for wire, pauli in enumerate(word):
+                if pauli == "I":
+                    continue
+                index = [slice(None)] * self.n_wires
+                index[wire] = 1
+                if pauli in "XY":
+                    self.pauli_state[...] = np.flip(self.pauli_state, axis = wire)
+                if pauli == "Y":
+                    # Y = iXZ
+                    self.pauli_state *= 1j
+                    index[wire] = 0
+                if pauli in "YZ":
+                    self.pauli_state[tuple(index)] *= -1
+            out += coefficient * self.pauli_state
+        return out
+
+    def expval(self, params, terms):
+        """Exact expectation of the Hamiltonian in the state of the ansatz."""
+        state = self.run(params)
+        h_state = self.apply_hamiltonian(terms, state, self.adjoint_state)
+        return np.vdot(state, h_state).real
+
+    def gradient(self, params, terms):
+        """Gradient of `expval` with respect to the parameters, computed by
+        adjoint differentiation: one backward sweep over the gates.
+        """
+        angles = self.angles(params)
+        state = self.run(params)
+        adjoint_state = self.apply_hamiltonian(terms, state, self.adjoint_state)
+
+        angle_gradient = np.zeros(len(angles))
+        k = len(angles)
+        for matrix, derivative, control, target, parametrized in reversed(self.gates):
+            gate = matrix(angles[k - 1]) if parametrized else matrix()
+            # Undo the gate on the state
+            self.apply(gate.conj().T, state, target, control)
+            if parametrized:
+                k -= 1
+                self.derivative_state[...] = state
+                self.apply_derivative(derivative(angles[k]), self.derivative_state, target, control)
+                angle_gradient[k] = 2 * np.vdot(adjoint_state, self.derivative_state).real
+            self.apply(gate.conj().T, adjoint_state, target, control)
+
+        return self.coefficients.T @ angle_gradient
@@ -1,6 +1,10 @@
 import pennylane as qml
 import pennylane.numpy as np
 
+from hamiltonian import grouped_cost
+from checkpoint import checkpointed_vqe
+from multistart import multistart_vqe
+
 dev = qml.device(
     "default.qubit",
     wires = 2,
@@ -27,6 +31,20 @@ def iz_cost(params):
     ansatz(params)
     return qml.expval(qml.PauliZ(1))
 
+# XZ and IZ commute qubit-wise so both are read from a single execution
+xz_iz_terms = [(1, "XZ"), (1, "IZ")]
+xz_iz_cost = grouped_cost(ansatz, xz_iz_terms, dev)
+
+# A device seeded with a generator whose state the checkpoints save
+checkpoint_rng = np.random.default_rng(0)
+checkpoint_dev = qml.device(
+    "default.qubit",
+    wires = 2,
+    shots = 100000,
+    seed = checkpoint_rng
+)
+checkpoint_xz_iz_cost = grouped_cost(ansatz, xz_iz_terms, checkpoint_dev)
+
 def vqe(cost, params, maxiter):
     optimizer = qml.SPSAOptimizer(maxiter = maxiter)
     energy = cost(params)
@@ -63,3 +81,30 @@ if __name__ == "__main__":
     # Print the final energy
     energy = xz_energy + iz_energy
     print("Final energy:", energy)
+
+    # Run VQE on the grouped Hamiltonian
+    print("\nOptimizer progress for the grouped XZ + IZ Hamiltonian:")
+    grouped_energy, _ = vqe(xz_iz_cost, init_params, maxiter)
+    print("Final energy with grouped measurements:", grouped_energy)
+
+    # The grouped cost broadcasts over a trailing batch axis, so SPSA runs
+    # from 8 random starts with one batched evaluation per step; the start
+    # with the lowest averaged final energy wins
+    multistart_energy, _, _ = multistart_vqe(xz_iz_cost, np.random.normal(0, np.pi, (8, 6)), maxiter)
+    print("Best energy over 8 starts:", multistart_energy)
+
+    # Run VQE with a streamed log and checkpoints from fixed initial params.
+    # They are written to the git-ignored .vqe_checkpoints/ next to this
+    # script, so rerunning it resumes this run, or only measures the final
+    # energy again if the run had finished; delete the directory, or pass
+    # another `directory`, to start anew
+    checkpoint_init_params = np.array(np.random.default_rng(1).normal(0, np.pi, 6), requires_grad = True)
+    checkpointed_energy, _ = checkpointed_vqe(
+        checkpoint_xz_iz_cost,
+        checkpoint_init_params,
+        maxiter,
+        "xz-iz-vqe-2",
+        checkpoint_dev,
+        checkpoint_rng
+    )
+    print("Final energy of the checkpointed run:", checkpointed_energy)
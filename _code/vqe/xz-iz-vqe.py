@@ -2,6 +2,8 @@ import pennylane as qml
 import pennylane.numpy as np
 import matplotlib.pyplot as plt
 
+from statevector import StatevectorSimulator
+
 dev = qml.device(
     "default.qubit",
     wires = 2,
@@ -34,6 +36,16 @@ def xz_iz_cost(params):
     h = qml.PauliX(0) @ qml.PauliZ(1) + qml.PauliZ(1)
     return qml.expval(h)
 
+# The ansatz simulated exactly, with adjoint gradients
+xz_iz_terms = [(1, "XZ"), (1, "IZ")]
+simulator = StatevectorSimulator(ansatz, n_params = 6, n_wires = 2)
+
+def exact_xz_iz_cost(params):
+    return simulator.expval(params, xz_iz_terms)
+
+def exact_xz_iz_gradient(params):
+    return simulator.gradient(params, xz_iz_terms)
+
 def vqe(cost, params, maxiter):
     optimizer = qml.SPSAOptimizer(maxiter = maxiter)
     energy = cost(params)
@@ -54,6 +66,28 @@ def vqe(cost, params, maxiter):
     
     return energy, history
 
+def gradient_vqe(cost, gradient, params, maxiter, stepsize = 0.1):
+    optimizer = qml.AdamOptimizer(stepsize = stepsize)
+    energy = cost(params)
+    history = [energy]
+
+    for iter in range(maxiter):
+        params, _ = optimizer.step_and_cost(
+            cost,
+            params,
+            grad_fn = gradient
+        )
+        energy = cost(params)
+
+        # Print the optimizer progress every 100 steps
+        if iter % 100 == 0:
+            print(f"Step = {iter},  Energy = {history[-1]:.8f}")
+
+        # Save the full energy optimization history
+        history.append(energy)
+
+    return energy, history
+
 if __name__ == "__main__":
     # Initialize params from the normal distribution with mean 0 and variance np.pi
     init_params = np.random.normal(0, np.pi, 6)
@@ -72,6 +106,10 @@ if __name__ == "__main__":
     # print(xz_energy + iz_energy)
     print(energy)
 
+    # Run VQE with exact energies and gradients
+    exact_energy, _ = gradient_vqe(exact_xz_iz_cost, exact_xz_iz_gradient, init_params, 1_000)
+    print(exact_energy)
+
     # Plot the optimization history
     plt.figure(figsize=(10, 6))
     plt.plot(range(maxiter + 1), history, "go", ls = "dashed", label = "Energy")